@@ -0,0 +1,225 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary, ref
+
+from game import Game, Player, Property
+
+DEFAULT_HORIZON = 3  # 默认评估未来回合数
+MAX_HORIZON = 10
+
+# 两颗骰子点数和的概率分布
+DICE_DISTRIBUTION = tuple(
+    (total, (6 - abs(total - 7)) / 36) for total in range(2, 13)
+)
+
+
+@lru_cache(maxsize=4096)
+def expected_landings(start: int, board_size: int, horizon: int) -> Tuple[float, ...]:
+    """从 start 出发，未来 horizon 回合内落在每个地块上的期望次数（不考虑卡片移动）"""
+    distribution = [0.0] * board_size
+    distribution[start] = 1.0
+    landings = [0.0] * board_size
+    for _ in range(horizon):
+        next_distribution = [0.0] * board_size
+        for position, probability in enumerate(distribution):
+            if probability == 0.0:
+                continue
+            for total, dice_probability in DICE_DISTRIBUTION:
+                next_distribution[(position + total) % board_size] += probability * dice_probability
+        distribution = next_distribution
+        for position, probability in enumerate(distribution):
+            landings[position] += probability
+    return tuple(landings)
+
+
+def _is_active(player: Player) -> bool:
+    return player.money > 0 or len(player.properties) > 0
+
+
+class Advisor:
+    """只读的行动评估器：为一个玩家的所有候选行动（购买、升级、抵押、赎回、出售）计算未来 K 回合的期望现金流
+
+    对手落点期望按对手位置缓存；每个地块的评估结果按 (所在颜色组各地块的状态, 对手位置) 缓存，
+    组内任一地块的归属、房屋或抵押状态变化时只重新计算该组的地块。
+    """
+
+    def __init__(self, game: Game):
+        self._game = ref(game)  # 弱引用，避免评估器缓存让游戏对象无法释放
+        self._opponent_landings: Dict[Tuple, Tuple[float, ...]] = {}
+        self._tile_cache: Dict[int, Tuple[Tuple, List[Dict[str, Any]]]] = {}
+        self._result_cache: Dict[Tuple, Dict[str, Any]] = {}
+        self._tile_indices = {tile.name: index for index, tile in enumerate(game.board.tiles) if isinstance(tile, Property)}
+
+    @property
+    def game(self) -> Game:
+        return self._game()
+
+    def state_key(self, player: Player, horizon: int) -> Tuple:
+        """评估结果依赖的全部状态，直接作为结果缓存的键（哈希碰撞时仍按内容比较）"""
+        return (
+            player.name,
+            player.money,
+            player.position,
+            horizon,
+            tuple((p.name, p.position, p.money, len(p.properties)) for p in self.game.players),
+            tuple(self._tile_state(tile) for tile in self.game.board.tiles),
+            self.game.pending_action and tuple(sorted(self.game.pending_action.items())),
+        )
+
+    @staticmethod
+    def _tile_state(tile) -> Tuple:
+        if not isinstance(tile, Property):
+            return ()
+        return (tile.owner.name if tile.owner else None, tile.houses, tile.is_mortgaged)
+
+    def _group_state(self, tile: Property) -> Tuple:
+        """地块评估依赖的状态：所在颜色组全部地块的状态（不属于任何组时只有本地块）"""
+        if tile.group is None:
+            return (self._tile_state(tile),)
+        return tuple(self._tile_state(member) for member in tile.group.properties)
+
+    def _landings_for(self, player: Player, horizon: int) -> Tuple[float, ...]:
+        """所有仍在游戏中的对手在未来 horizon 回合内落在每个地块上的期望次数之和"""
+        board_size = self.game.board.size
+        positions = tuple(sorted(
+            p.position for p in self.game.players if p is not player and _is_active(p)
+        ))
+        key = (positions, board_size, horizon)
+        landings = self._opponent_landings.get(key)
+        if landings is None:
+            totals = [0.0] * board_size
+            for position in positions:
+                for i, value in enumerate(expected_landings(position, board_size, horizon)):
+                    totals[i] += value
+            landings = tuple(totals)
+            if len(self._opponent_landings) > 256:
+                self._opponent_landings.clear()
+            self._opponent_landings[key] = landings
+        return landings
+
+    def evaluate(self, player_name: str, horizon: int = DEFAULT_HORIZON) -> Dict[str, Any]:
+        """评估玩家所有候选行动，按净价值从高到低排序，不修改游戏状态"""
+        player = next((p for p in self.game.players if p.name == player_name), None)
+        if player is None:
+            return {"error": "Player not found"}
+        horizon = max(1, min(int(horizon), MAX_HORIZON))
+
+        state = self.state_key(player, horizon)
+        cached = self._result_cache.get(state)
+        if cached is not None:
+            return dict(cached)
+
+        landings = self._landings_for(player, horizon)
+        landings_key = (player.name, horizon, landings)
+        candidates = []
+        for index, tile in enumerate(self.game.board.tiles):
+            if not isinstance(tile, Property) or tile.cost[0] <= 0:
+                continue
+            tile_key = (self._group_state(tile), landings_key)
+            cached_tile = self._tile_cache.get(index)
+            if cached_tile is None or cached_tile[0] != tile_key:
+                cached_tile = (tile_key, self._evaluate_tile(player, tile, landings, self._tile_indices))
+                self._tile_cache[index] = cached_tile
+            for candidate in cached_tile[1]:
+                candidate = dict(candidate)
+                candidate["affordable"] = player.money + candidate["cash_delta"] >= 0
+                candidate["available_now"] = self._available_now(player, index, candidate["action"])
+                candidates.append(candidate)
+
+        candidates.sort(key=lambda c: c["net_value"], reverse=True)
+        result = {
+            "player": player.name,
+            "horizon": horizon,
+            "money": player.money,
+            "candidates": candidates,
+        }
+        if len(self._result_cache) > 64:
+            self._result_cache.clear()
+        self._result_cache[state] = result
+        return dict(result)
+
+    def _available_now(self, player: Player, index: int, action: str) -> bool:
+        """该行动在当前游戏状态下能否立即执行"""
+        if action in ("mortgage", "redeem", "sell"):
+            return True
+        pending = self.game.pending_action
+        return (
+            self.game.get_current_player() is player
+            and player.position == index
+            and pending is not None
+            and pending.get("action") == ("prompt_buy" if action == "buy" else "prompt_upgrade")
+        )
+
+    @staticmethod
+    def _evaluate_tile(player: Player, tile: Property, landings: Tuple[float, ...],
+                       tile_indices: Dict[str, int]) -> List[Dict[str, Any]]:
+        """计算单个地块的候选行动
+
+        cash_delta 为立即现金变化，expected_rent 为未来回合租金收入变化（包括行动形成或打破整组垄断时
+        组内其他地块的租金变化），net_value 再计入总资产价值的变化（与 get_total_asset_value 的计算方式一致）。
+        """
+        candidates = []
+        landing = landings[tile_indices[tile.name]]
+        others = [member for member in tile.group.properties if member is not tile] if tile.group else []
+
+        def monopoly_after(owned: bool) -> bool:
+            """行动后玩家是否整组垄断：owned 表示行动后本地块归玩家所有且未抵押"""
+            return tile.group is not None and owned and all(
+                member.owner is player and not member.is_mortgaged for member in others
+            )
+
+        def group_rent_delta(monopoly: bool) -> float:
+            """垄断状态变为 monopoly 时，玩家在组内其他地块上的期望租金变化"""
+            if monopoly == tile.has_monopoly:
+                return 0.0
+            return sum(
+                (member.rent_at(member.houses, monopoly) - member.rent_at(member.houses)) * landings[tile_indices[member.name]]
+                for member in others
+                if member.owner is player and not member.is_mortgaged
+            )
+
+        def add(action: str, cash_delta: int, rent_delta: float, asset_delta: int, group_delta: float = 0.0):
+            expected_rent = round(rent_delta * landing + group_delta, 2)
+            candidates.append({
+                "action": action,
+                "property": tile.name,
+                "cash_delta": cash_delta,
+                "expected_rent": expected_rent,
+                "expected_cash_flow": round(cash_delta + expected_rent, 2),
+                "net_value": round(cash_delta + expected_rent + asset_delta, 2),
+            })
+
+        current_rent = tile.rent_at(tile.houses)
+        if tile.owner is None:
+            monopoly = monopoly_after(True)
+            add("buy", -tile.cost[0], tile.rent_at(0, monopoly), tile.selling_price, group_rent_delta(monopoly))
+        elif tile.owner is player:
+            lost = group_rent_delta(False)
+            if tile.is_mortgaged:
+                monopoly = monopoly_after(True)
+                add("redeem", -tile.mortgage_value, tile.rent_at(tile.houses, monopoly), tile.selling_price,
+                    group_rent_delta(monopoly))
+            else:
+                if tile.can_upgrade():
+                    add("upgrade", -tile.cost[tile.houses + 1], tile.rent_at(tile.houses + 1) - current_rent, 0)
+                add("mortgage", tile.mortgage_value, -current_rent, -tile.selling_price, lost)
+            add("sell", tile.selling_price, 0 if tile.is_mortgaged else -current_rent,
+                0 if tile.is_mortgaged else -tile.selling_price, lost)
+        return candidates
+
+
+_advisors: "WeakKeyDictionary[Game, Advisor]" = WeakKeyDictionary()
+
+
+def get_advisor(game: Game) -> Advisor:
+    """获取游戏对应的评估器（随游戏对象释放）"""
+    advisor = _advisors.get(game)
+    if advisor is None:
+        advisor = Advisor(game)
+        _advisors[game] = advisor
+    return advisor
+
+
+def get_advice(game: Game, player_name: str, horizon: Optional[int] = None) -> Dict[str, Any]:
+    """评估玩家的所有候选行动"""
+    return get_advisor(game).evaluate(player_name, horizon or DEFAULT_HORIZON)
@@ -0,0 +1,158 @@
+import csv
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from game import Game
+
+# 每行记录的字段和类型（写入 Parquet 时据此生成表结构）
+ANALYTICS_SCHEMA = [
+    ("game_id", str),
+    ("turn", int),
+    ("timestamp", float),
+    ("player", str),
+    ("action", str),  # roll / buy / upgrade / mortgage / redeem / sell / end_turn / bankrupt
+    ("roll", int),
+    ("tile", str),
+    ("rent", int),
+    ("cash", int),
+    ("total_asset_value", int),
+    ("property", str),  # 发生归属或状态变化的地块
+    ("ownership_change", str),  # acquire / release / mortgage / redeem / upgrade
+    ("game_over", bool),
+]
+
+DEFAULT_BATCH_SIZE = 500  # 缓冲满该行数后交给写入线程
+
+
+def _load_pyarrow():
+    """按需导入 pyarrow，未安装时返回 None（退回 CSV）"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+class AnalyticsExporter:
+    """对局数据导出器
+
+    record() 只把行追加到内存缓冲区，满一批后交给后台写入线程，调用方永远不会等待磁盘 I/O。
+    安装了 pyarrow 时每批写为一个 Parquet 文件，否则写为 CSV 文件。
+    """
+
+    def __init__(self, output_dir: str = "analytics", batch_size: int = DEFAULT_BATCH_SIZE):
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self._buffer: List[Dict[str, Any]] = []
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._file_prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._file_count = 0
+        self.rows_written = 0
+
+    def record(self, row: Dict[str, Any]):
+        """记录一行（不阻塞）"""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """把当前缓冲区交给写入线程（不阻塞）"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_loop, name="analytics-writer", daemon=True)
+            self._thread.start()
+        self._queue.put_nowait(batch)
+
+    def close(self, timeout: float = 5.0):
+        """写出剩余数据并停止写入线程"""
+        self.flush()
+        if self._thread is not None:
+            self._queue.put_nowait(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _writer_loop(self):
+        pyarrow = _load_pyarrow()
+        os.makedirs(self.output_dir, exist_ok=True)
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            try:
+                self._file_count += 1
+                if pyarrow is not None:
+                    self._write_parquet(pyarrow, batch)
+                else:
+                    self._write_csv(batch)
+                self.rows_written += len(batch)
+            except Exception as e:
+                print(f"分析数据写入失败 ({type(e).__name__}): {e}")
+
+    def _batch_path(self, extension: str) -> str:
+        return os.path.join(self.output_dir, f"{self._file_prefix}-{self._file_count:05d}.{extension}")
+
+    def _write_parquet(self, pyarrow, batch: List[Dict[str, Any]]):
+        arrow_types = {str: pyarrow.string(), int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_()}
+        schema = pyarrow.schema([(name, arrow_types[kind]) for name, kind in ANALYTICS_SCHEMA])
+        columns = {name: [row.get(name) for row in batch] for name, _ in ANALYTICS_SCHEMA}
+        table = pyarrow.Table.from_pydict(columns, schema=schema)
+        pyarrow.parquet.write_table(table, self._batch_path("parquet"))
+
+    def _write_csv(self, batch: List[Dict[str, Any]]):
+        fieldnames = [name for name, _ in ANALYTICS_SCHEMA]
+        with open(self._batch_path("csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(batch)
+
+
+class GameRecorder:
+    """把一局游戏的每个操作记录为带类型的行"""
+
+    def __init__(self, exporter: AnalyticsExporter, game: Game):
+        self.exporter = exporter
+        self.game = game
+        self.game_id = uuid.uuid4().hex
+        self.turn = 0
+
+    def record(self, action: str, player_name: str, result: Optional[Dict[str, Any]] = None,
+               property_name: str = "", ownership_change: str = ""):
+        """根据操作结果记录一行，出错的操作不记录"""
+        result = result or {}
+        if "error" in result:
+            return
+        if action == "roll":
+            self.turn += 1
+        player = next((p for p in self.game.players if p.name == player_name), None)
+        row = {
+            "game_id": self.game_id,
+            "turn": self.turn,
+            "timestamp": time.time(),
+            "player": player_name,
+            "action": action,
+            "roll": result.get("dice_total", 0),
+            "tile": result.get("landed_on", ""),
+            "rent": result.get("rent", 0),
+            "cash": player.money if player else 0,
+            "total_asset_value": player.get_total_asset_value() if player else 0,
+            "property": property_name,
+            "ownership_change": ownership_change,
+            "game_over": bool(result.get("game_over", False)),
+        }
+        self.exporter.record(row)
+
+        # 破产时所有地块归还银行
+        debt = result.get("debt_situation")
+        if debt and not debt.get("can_recover", True):
+            self.exporter.record(dict(row, action="bankrupt", player=debt["player"], cash=0,
+                                      total_asset_value=0, ownership_change="release", property=""))
+        if row["game_over"]:
+            self.exporter.flush()
@@ -0,0 +1,130 @@
+import heapq
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+AUCTION_DURATION = 10.0  # 拍卖时长（秒）
+AUCTION_MIN_INCREMENT = 1  # 新出价至少比当前最高价高出的金额
+AUCTION_MIN_BID_INTERVAL = 0.25  # 同一玩家两次出价的最小间隔（秒），超过频率的出价被拒绝
+AUCTION_TICK_INTERVAL = 0.25  # 服务器每隔该秒数广播一次当前最高价（有变化时）并检查是否结束
+
+
+class Bid(NamedTuple):
+    player: str
+    amount: int
+    seq: int  # 出价顺序，同价时先出价者优先
+
+
+class BidBook:
+    """出价簿：所有出价放在最大堆中，每位玩家只有最新一次出价有效
+
+    新出价和撤销都是 O(log n)；被替换或撤销的出价不立即删除，取最高价时从堆顶惰性清除。
+    堆按 (金额降序, 出价顺序) 排列，同一组出价的结算结果与到达时机无关。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, str]] = []  # (-金额, 序号, 玩家)
+        self._latest: Dict[str, Bid] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def add(self, player: str, amount: int) -> Bid:
+        self._seq += 1
+        bid = Bid(player, amount, self._seq)
+        self._latest[player] = bid
+        heapq.heappush(self._heap, (-amount, bid.seq, player))
+        return bid
+
+    def withdraw(self, player: str):
+        """撤销玩家的出价（例如结算时现金不足）"""
+        self._latest.pop(player, None)
+
+    def best(self) -> Optional[Bid]:
+        heap = self._heap
+        while heap:
+            _, seq, player = heap[0]
+            bid = self._latest.get(player)
+            if bid is not None and bid.seq == seq:
+                return bid
+            heapq.heappop(heap)
+        return None
+
+
+class Auction:
+    """一次限时拍卖
+
+    出价由服务器在收到消息时立即校验并写入出价簿，不立即广播；服务器每个 tick 调用
+    take_update()，最高价有变化时才广播一次。时间到后由 Game.finish_auction() 结算。
+    """
+
+    def __init__(self, property_name: str, bidders: Iterable[str], started_at: float,
+                 duration: float = AUCTION_DURATION, min_increment: int = AUCTION_MIN_INCREMENT,
+                 min_bid_interval: float = AUCTION_MIN_BID_INTERVAL):
+        self.property_name = property_name
+        self.bidders = set(bidders)
+        self.started_at = started_at
+        self.ends_at = started_at + duration
+        self.min_increment = min_increment
+        self.min_bid_interval = min_bid_interval
+        self.book = BidBook()
+        self.bid_count = 0
+        self.rejected_count = 0
+        self._last_bid_at: Dict[str, float] = {}
+        self._published_seq = 0  # 上次广播时最高价的出价序号
+
+    def minimum_bid(self) -> int:
+        best = self.book.best()
+        return best.amount + self.min_increment if best else self.min_increment
+
+    def place_bid(self, player: str, amount: Any, cash: int, now: float) -> Optional[str]:
+        """校验并记录出价，成功返回 None，否则返回错误信息"""
+        error = self._validate(player, amount, cash, now)
+        if error is not None:
+            self.rejected_count += 1
+            return error
+        self._last_bid_at[player] = now
+        self.book.add(player, amount)
+        self.bid_count += 1
+        return None
+
+    def _validate(self, player: str, amount: Any, cash: int, now: float) -> Optional[str]:
+        if self.is_over(now):
+            return "拍卖已结束"
+        if player not in self.bidders:
+            return "您不能参加本次拍卖"
+        if not isinstance(amount, int) or isinstance(amount, bool):
+            return "出价必须是整数"
+        if now - self._last_bid_at.get(player, float("-inf")) < self.min_bid_interval:
+            return "出价过于频繁，请稍后再试"
+        minimum = self.minimum_bid()
+        if amount < minimum:
+            return f"出价至少为 ${minimum}"
+        if amount > cash:
+            return "现金不足"
+        return None
+
+    def is_over(self, now: float) -> bool:
+        return now >= self.ends_at
+
+    def take_update(self, now: float) -> Optional[Dict[str, Any]]:
+        """最高价自上次调用后有变化时返回当前状态，否则返回 None"""
+        best = self.book.best()
+        seq = best.seq if best else 0
+        if seq == self._published_seq:
+            return None
+        self._published_seq = seq
+        return self.to_dict(now)
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        if now is None:
+            now = time.monotonic()
+        best = self.book.best()
+        return {
+            "property": self.property_name,
+            "best_bid": best.amount if best else None,
+            "best_bidder": best.player if best else None,
+            "minimum_bid": self.minimum_bid(),
+            "bids": self.bid_count,
+            "ends_in": round(max(0.0, self.ends_at - now), 2),
+        }
@@ -0,0 +1,266 @@
+"""热点路径微基准测试
+
+用法:
+    python benchmark.py                 # 运行全部基准，与基线比较，退步超过阈值时返回非零退出码
+    python benchmark.py --save          # 运行并把结果保存为新的基线
+    python benchmark.py board_construction broadcast_json   # 只运行指定的基准
+
+每个基准用 timeit 自动确定循环次数，重复多轮取最快一轮的单次耗时（微秒），
+结果与 JSON 基线比较；基线与机器相关，在同一台机器上比较才有意义。
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List
+
+from game import Board, EventCard, Game
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # 比基线慢超过该比例视为退步
+DEFAULT_REPEAT = 5
+DEFAULT_SOCKETS = 100  # 广播基准的假连接数
+PLAYER_NAMES = ["玩家1", "玩家2", "玩家3", "玩家4"]
+
+# 基准注册表：名称 -> 构造函数（在计时外完成准备工作，返回被计时的无参函数）
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+def _played_game(turns: int = 40, seed: int = 0) -> Game:
+    """进行若干回合后的游戏，使玩家持有地块和房屋"""
+    random.seed(seed)
+    game = Game(PLAYER_NAMES)
+    for _ in range(turns):
+        d1, d2 = game.roll_dice()
+        result = game.play_turn_network(d1 + d2)
+        action = (game.pending_action or {}).get("action")
+        if action == "prompt_buy":
+            game.buy_property()
+        elif action == "prompt_upgrade":
+            game.upgrade_property()
+        if result.get("game_over") or game.is_game_over():
+            break
+        game.next_player()
+        game.pending_action = None
+    return game
+
+
+class FakeWebSocket:
+    """内存中的假连接：只统计发送的字节数"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data)
+
+    async def send_bytes(self, data: bytes):
+        self.bytes_sent += len(data)
+
+    async def send_json(self, data):
+        self.bytes_sent += len(json.dumps(data))
+
+
+@benchmark("board_construction")
+def bench_board_construction(args):
+    return Board
+
+
+@benchmark("play_turn_network")
+def bench_play_turn_network(args):
+    random.seed(1)
+    state = {"game": Game(PLAYER_NAMES)}
+
+    def run():
+        game = state["game"]
+        if game.is_game_over():
+            game = state["game"] = Game(PLAYER_NAMES)
+        d1, d2 = game.roll_dice()
+        game.play_turn_network(d1 + d2)
+        game.next_player()
+        game.pending_action = None
+    return run
+
+
+@benchmark("to_dict_snapshot")
+def bench_to_dict(args):
+    game = _played_game()
+
+    def run():
+        return ([p.to_dict() for p in game.players],
+                [t.to_dict() for t in game.board.tiles if hasattr(t, "to_dict")])
+    return run
+
+
+@benchmark("event_card_trigger")
+def bench_event_card_trigger(args):
+    random.seed(2)
+    game = _played_game()
+    player = game.players[0]
+    cards = [t for t in game.board.tiles if isinstance(t, EventCard)]
+
+    def run():
+        player.money = 1500
+        for card in cards:
+            card.trigger(player)
+    return run
+
+
+@benchmark("total_asset_value")
+def bench_total_asset_value(args):
+    game = _played_game()
+
+    def run():
+        return [p.get_total_asset_value() for p in game.players]
+    return run
+
+
+@benchmark("get_game_state")
+def bench_get_game_state(args):
+    game = _played_game()
+    return game.get_game_state
+
+
+def _bench_broadcast(args, protocol: str):
+    import server
+
+    server.game = _played_game()
+    server.connections.clear()
+    server.connection_protocols.clear()
+    for i in range(args.sockets):
+        name = f"观众{i}"
+        server.connections[name] = FakeWebSocket()
+        server.connection_protocols[name] = protocol
+    message = server.game.get_game_state()
+    message["type"] = "game_state"
+    loop = asyncio.new_event_loop()
+
+    def run():
+        loop.run_until_complete(server.broadcast(dict(message)))
+    return run
+
+
+@benchmark("broadcast_json")
+def bench_broadcast_json(args):
+    from protocol import PROTOCOL_JSON
+    return _bench_broadcast(args, PROTOCOL_JSON)
+
+
+@benchmark("broadcast_packed")
+def bench_broadcast_packed(args):
+    from protocol import PROTOCOL_PACKED
+    return _bench_broadcast(args, PROTOCOL_PACKED)
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """返回单次调用的最快耗时（微秒）"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e6
+
+
+def run_benchmarks(names: List[str], args: argparse.Namespace) -> Dict[str, float]:
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name](args)
+        # 被测代码中的日志输出（如广播结果）不写到终端，但仍计入耗时
+        with contextlib.redirect_stdout(io.StringIO()) as sink:
+            def quiet():
+                sink.seek(0)
+                sink.truncate()
+                return func()
+            results[name] = measure(quiet, args.repeat)
+        print(f"{name:<24} {results[name]:>12.2f} us")
+    return results
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, results: Dict[str, float], args: argparse.Namespace):
+    baseline = load_baseline(path)
+    baseline.update({name: round(value, 3) for name, value in results.items()})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "sockets": args.sockets,
+            "results": baseline,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"基线已保存: {path}")
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """与基线比较，返回退步的基准名"""
+    regressions = []
+    print(f"\n{'基准':<22} {'基线(us)':>12} {'本次(us)':>12} {'变化':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<24} {'-':>12} {value:>12.2f} {'新增':>8}")
+            continue
+        change = value / base - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  <-- 退步"
+        print(f"{name:<24} {base:>12.2f} {value:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="大富翁热点路径微基准测试")
+    parser.add_argument("names", nargs="*", help=f"要运行的基准（默认全部）: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--save", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="允许的退步比例，默认 0.25")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="重复轮数，取最快一轮")
+    parser.add_argument("--sockets", type=int, default=DEFAULT_SOCKETS, help="广播基准的假连接数")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准: {', '.join(unknown)}")
+    results = run_benchmarks(args.names or list(BENCHMARKS), args)
+
+    if args.save:
+        save_baseline(args.baseline, results, args)
+        return 0
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\n错误：没有基线文件 {args.baseline}，无法检查性能退步；先用 --save 保存基线", file=sys.stderr)
+        return 2
+    regressions = compare(results, baseline, args.threshold)
+    missing = [name for name in results if not baseline.get(name)]
+    if regressions:
+        print(f"\n性能退步超过 {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    if missing:
+        print(f"\n错误：基线中没有这些基准，无法检查: {', '.join(missing)}；用 --save 补充基线", file=sys.stderr)
+        return 2
+    print("\n未发现性能退步")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python 3.11 以下没有 tomllib，只支持 JSON 地图
+    tomllib = None
+
+BOARD_FORMAT_VERSION = 1  # 当前支持的地图文件格式版本
+MAPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
+DEFAULT_BOARD_NAME = "classic"
+
+START_TILE = "起点"
+EVENT_TILES = ("机遇", "命运")
+DEFAULT_MONOPOLY_MULTIPLIER = 2  # 同一玩家拥有整组且均未抵押时的租金倍数
+
+
+class TileSpec(NamedTuple):
+    """编译后的地块定义（不可变）"""
+    kind: str  # "start" / "property" / "event"
+    name: str
+    cost: Tuple[int, ...] = (0,)
+    rent: Tuple[int, ...] = (0,)
+    mortgage_value: int = 0
+    selling_price: int = 0
+    group: Optional[str] = None  # 所属颜色组
+    monopoly_rent: Tuple[int, ...] = (0,)  # 拥有整组时各房屋数的租金（预先计算）
+
+
+class GroupSpec(NamedTuple):
+    """颜色组定义"""
+    name: str
+    color: str
+    positions: Tuple[int, ...]  # 组内地块在地图中的下标
+    monopoly_multiplier: int
+
+
+class BoardTemplate(NamedTuple):
+    """编译后的地图模板：校验一次，所有使用该地图的房间共享"""
+    name: str  # 地图名，即地图文件名（不含扩展名），客户端按它请求 /api/board-data
+    title: str
+    digest: str  # 地图内容的 sha256，用作缓存键
+    max_houses: int
+    railroad_positions: Tuple[int, ...]
+    tiles: Tuple[TileSpec, ...]
+    game_map: Tuple[str, ...]
+    countries: Mapping[str, Mapping[str, Any]]
+    groups: Mapping[str, GroupSpec]
+
+
+# 模板缓存：按 (地图名, 内容摘要) 和地图名索引，同一地图的相同内容只编译一次
+_templates_by_digest: Dict[Tuple[str, str], BoardTemplate] = {}
+_templates_by_name: Dict[str, BoardTemplate] = {}
+
+
+def _require(condition: bool, board_name: str, message: str):
+    if not condition:
+        raise ValueError(f"地图 {board_name} 无效: {message}")
+
+
+def _is_int_list(value: Any, length: int) -> bool:
+    return isinstance(value, list) and len(value) == length and all(isinstance(v, int) for v in value)
+
+
+def compile_board(data: Dict[str, Any], board_name: str = "<memory>") -> BoardTemplate:
+    """校验地图数据并编译为模板，相同内容返回同一个缓存的模板对象"""
+    digest = hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    cached = _templates_by_digest.get((board_name, digest))
+    if cached is not None:
+        return cached
+
+    _require(isinstance(data, dict), board_name, "顶层必须是对象")
+    _require(data.get("name", board_name) == board_name, board_name,
+             f"name 字段 {data.get('name')!r} 与地图名不一致")
+    _require(data.get("format_version") == BOARD_FORMAT_VERSION, board_name,
+             f"不支持的格式版本 {data.get('format_version')}，当前版本为 {BOARD_FORMAT_VERSION}")
+
+    max_houses = data.get("max_houses")
+    _require(isinstance(max_houses, int) and max_houses >= 0, board_name, "max_houses 必须是非负整数")
+
+    countries = data.get("countries")
+    _require(isinstance(countries, dict), board_name, "countries 必须是对象")
+    for country_name, country in countries.items():
+        _require(isinstance(country, dict), board_name, f"{country_name} 必须是对象")
+        _require(_is_int_list(country.get("cost"), max_houses + 1), board_name,
+                 f"{country_name}.cost 必须是 {max_houses + 1} 个整数")
+        _require(_is_int_list(country.get("rent"), max_houses + 1), board_name,
+                 f"{country_name}.rent 必须是 {max_houses + 1} 个整数")
+        _require(isinstance(country.get("mortgage_value"), int), board_name, f"{country_name}.mortgage_value 必须是整数")
+        _require(isinstance(country.get("selling_price"), int), board_name, f"{country_name}.selling_price 必须是整数")
+
+    game_map = data.get("game_map")
+    _require(isinstance(game_map, list) and len(game_map) >= 2, board_name, "game_map 至少需要 2 个地块")
+    _require(game_map[0] == START_TILE, board_name, f"第一个地块必须是 {START_TILE}")
+    _require(all(isinstance(tile_name, str) for tile_name in game_map), board_name, "game_map 的地块名必须是字符串")
+    placed = [tile_name for tile_name in game_map if tile_name in countries]
+    _require(len(placed) == len(set(placed)), board_name, "同一地块在 game_map 中出现多次")
+    placed_names = set(placed)
+
+    groups = data.get("groups", {})
+    _require(isinstance(groups, dict), board_name, "groups 必须是对象")
+    group_of: Dict[str, Tuple[str, int]] = {}  # 地块名 -> (组名, 租金倍数)
+    for group_name, group in groups.items():
+        _require(isinstance(group, dict), board_name, f"groups.{group_name} 必须是对象")
+        members = group.get("properties")
+        _require(isinstance(members, list) and len(members) > 0, board_name,
+                 f"groups.{group_name}.properties 必须是非空列表")
+        _require(isinstance(group.get("color", ""), str), board_name, f"groups.{group_name}.color 必须是字符串")
+        multiplier = group.get("monopoly_multiplier", DEFAULT_MONOPOLY_MULTIPLIER)
+        _require(isinstance(multiplier, int) and multiplier >= 1, board_name,
+                 f"groups.{group_name}.monopoly_multiplier 必须是正整数")
+        for member in members:
+            _require(member in countries, board_name, f"groups.{group_name} 中的 {member} 未在 countries 中定义")
+            # 缺少成员的颜色组永远无法凑齐，也不能让部分成员按整组垄断收租
+            _require(member in placed_names, board_name, f"groups.{group_name} 中的 {member} 不在 game_map 中")
+            _require(member not in group_of, board_name, f"{member} 属于多个颜色组")
+            group_of[member] = (group_name, multiplier)
+
+    tiles: List[TileSpec] = []
+    for tile_name in game_map:
+        if tile_name == START_TILE:
+            tiles.append(TileSpec("start", START_TILE))
+        elif tile_name in EVENT_TILES:
+            tiles.append(TileSpec("event", tile_name))
+        else:
+            _require(tile_name in countries, board_name, f"地块 {tile_name} 未在 countries 中定义")
+            country = countries[tile_name]
+            group_name, multiplier = group_of.get(tile_name, (None, 1))
+            tiles.append(TileSpec(
+                "property",
+                tile_name,
+                tuple(country["cost"]),
+                tuple(country["rent"]),
+                country["mortgage_value"],
+                country["selling_price"],
+                group_name,
+                tuple(rent * multiplier for rent in country["rent"]),
+            ))
+
+    railroad_positions = data.get("railroad_positions", [])
+    _require(isinstance(railroad_positions, list)
+             and all(isinstance(p, int) and 0 <= p < len(game_map) for p in railroad_positions),
+             board_name, "railroad_positions 必须是地图范围内的下标")
+
+    positions: Dict[str, List[int]] = {name: [] for name in groups}
+    for index, tile in enumerate(tiles):
+        if tile.group is not None:
+            positions[tile.group].append(index)
+
+    template = BoardTemplate(
+        name=board_name,
+        title=data.get("title", board_name),
+        digest=digest,
+        max_houses=max_houses,
+        railroad_positions=tuple(railroad_positions),
+        tiles=tuple(tiles),
+        game_map=tuple(game_map),
+        countries=MappingProxyType({
+            name: MappingProxyType({
+                "cost": tuple(country["cost"]),
+                "rent": tuple(country["rent"]),
+                "mortgage_value": country["mortgage_value"],
+                "selling_price": country["selling_price"],
+            })
+            for name, country in countries.items()
+        }),
+        groups=MappingProxyType({
+            name: GroupSpec(name, group.get("color", ""), tuple(positions[name]),
+                            group.get("monopoly_multiplier", DEFAULT_MONOPOLY_MULTIPLIER))
+            for name, group in groups.items()
+        }),
+    )
+    _templates_by_digest[(board_name, digest)] = template
+    return template
+
+
+def _find_board_file(board_name: str) -> Optional[str]:
+    for extension in (".json", ".toml"):
+        path = os.path.join(MAPS_DIR, board_name + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def list_boards() -> List[str]:
+    """列出 maps 目录中可用的地图名"""
+    if not os.path.isdir(MAPS_DIR):
+        return []
+    names = set()
+    for filename in os.listdir(MAPS_DIR):
+        name, extension = os.path.splitext(filename)
+        if extension == ".json" or (extension == ".toml" and tomllib is not None):
+            names.add(name)
+    return sorted(names)
+
+
+def load_board_template(board_name: str = DEFAULT_BOARD_NAME) -> BoardTemplate:
+    """按名称加载地图模板，每个地图文件只读取和校验一次"""
+    _require(isinstance(board_name, str), repr(board_name), "地图名必须是字符串")
+    template = _templates_by_name.get(board_name)
+    if template is not None:
+        return template
+
+    _require(os.path.basename(board_name) == board_name and not board_name.startswith("."),
+             board_name, "地图名不合法")
+    path = _find_board_file(board_name)
+    _require(path is not None, board_name, f"在 {MAPS_DIR} 中找不到地图文件")
+    if path.endswith(".toml"):
+        _require(tomllib is not None, board_name, "当前 Python 版本不支持 TOML 地图")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    template = compile_board(data, board_name)
+    _templates_by_name[board_name] = template
+    return template
@@ -0,0 +1,165 @@
+import time
+from bisect import bisect_right, insort
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+ROOM_MAIN = "main"  # 游戏房间
+ROOM_MATCHMAKING = "matchmaking"  # 匹配队列
+
+STATE_LOBBY = "lobby"  # 在房间中等待开始
+STATE_PLAYING = "playing"  # 游戏进行中
+STATE_QUEUED = "queued"  # 排队匹配中
+
+
+class ConnectionEntry:
+    """一个已建立的连接"""
+
+    __slots__ = ("name", "ip", "room", "state", "websocket", "connected_at")
+
+    def __init__(self, name: str, ip: str, room: str, state: str, websocket: Optional[WebSocket]):
+        self.name = name
+        self.ip = ip
+        self.room = room
+        self.state = state
+        self.websocket = websocket
+        self.connected_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "room": self.room,
+            "state": self.state,
+            "connected_at": self.connected_at,
+        }
+
+
+class ConnectionIndex:
+    """连接索引：按 IP、房间、状态建立索引，支持按名称游标分页
+
+    每个索引维护名称集合，增删和状态变化都是 O(1)（名称有序列表为 O(log n) 查找）；
+    每个 IP 在每个房间的连接数单独计数，连接限制检查不需要扫描任何列表。
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], ConnectionEntry] = {}  # (房间, 名称) -> 连接
+        self._names: List[Tuple[str, str]] = []  # 按 (名称, 房间) 排序，用于分页
+        self._by_ip: Dict[str, Set[Tuple[str, str]]] = {}
+        self._by_room: Dict[str, Set[Tuple[str, str]]] = {}
+        self._by_state: Dict[str, Set[Tuple[str, str]]] = {}
+        self._ip_room_counts: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _index_add(index: Dict[str, Set], key: str, item):
+        index.setdefault(key, set()).add(item)
+
+    @staticmethod
+    def _index_remove(index: Dict[str, Set], key: str, item):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(item)
+            if not bucket:
+                del index[key]
+
+    def add(self, name: str, ip: str, room: str, state: str, websocket: Optional[WebSocket] = None) -> ConnectionEntry:
+        """登记连接；同一房间中的同名连接会被替换"""
+        self.remove(name, room)
+        entry = ConnectionEntry(name, ip, room, state, websocket)
+        key = (room, name)
+        self._entries[key] = entry
+        insort(self._names, (name, room))
+        self._index_add(self._by_ip, ip, key)
+        self._index_add(self._by_room, room, key)
+        self._index_add(self._by_state, state, key)
+        self._ip_room_counts[(ip, room)] = self._ip_room_counts.get((ip, room), 0) + 1
+        return entry
+
+    def remove(self, name: str, room: str = ROOM_MAIN) -> Optional[ConnectionEntry]:
+        key = (room, name)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        position = bisect_right(self._names, (name, room)) - 1
+        if position >= 0 and self._names[position] == (name, room):
+            del self._names[position]
+        self._index_remove(self._by_ip, entry.ip, key)
+        self._index_remove(self._by_room, room, key)
+        self._index_remove(self._by_state, entry.state, key)
+        count = self._ip_room_counts.get((entry.ip, room), 0) - 1
+        if count > 0:
+            self._ip_room_counts[(entry.ip, room)] = count
+        else:
+            self._ip_room_counts.pop((entry.ip, room), None)
+        return entry
+
+    def get(self, name: str, room: str = ROOM_MAIN) -> Optional[ConnectionEntry]:
+        return self._entries.get((room, name))
+
+    def set_state(self, name: str, state: str, room: str = ROOM_MAIN):
+        entry = self._entries.get((room, name))
+        if entry is None or entry.state == state:
+            return
+        key = (room, name)
+        self._index_remove(self._by_state, entry.state, key)
+        entry.state = state
+        self._index_add(self._by_state, state, key)
+
+    def set_room_state(self, room: str, state: str):
+        """房间内所有连接切换到同一状态（例如游戏开始）"""
+        for _, name in list(self._by_room.get(room, ())):
+            self.set_state(name, state, room)
+
+    def clear_room(self, room: str) -> List[ConnectionEntry]:
+        """移除房间内所有连接，返回被移除的连接"""
+        return [self.remove(name, room) for _, name in list(self._by_room.get(room, ()))]
+
+    def ip_count(self, ip: str, room: str = ROOM_MAIN) -> int:
+        """某个 IP 在房间中的连接数"""
+        return self._ip_room_counts.get((ip, room), 0)
+
+    def ip_counts(self, room: str = ROOM_MAIN) -> Dict[str, int]:
+        return {ip: count for (ip, entry_room), count in self._ip_room_counts.items() if entry_room == room}
+
+    def ips(self) -> List[str]:
+        return sorted(self._by_ip)
+
+    def room_counts(self) -> Dict[str, Dict[str, int]]:
+        """每个房间的连接数和各状态人数"""
+        rooms = {}
+        for room, keys in self._by_room.items():
+            states: Dict[str, int] = {}
+            for key in keys:
+                state = self._entries[key].state
+                states[state] = states.get(state, 0) + 1
+            rooms[room] = {"connections": len(keys), "states": states}
+        return rooms
+
+    def query(self, ip: Optional[str] = None, room: Optional[str] = None, state: Optional[str] = None,
+              cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[ConnectionEntry], Optional[str]]:
+        """按条件筛选连接，按名称排序分页；返回 (本页连接, 下一页游标)
+
+        游标为上一页最后一个连接的 "名称/房间"。有筛选条件时从最小的索引集合开始求交集。
+        """
+        filters = [(self._by_ip, ip), (self._by_room, room), (self._by_state, state)]
+        selected = [index.get(value, set()) for index, value in filters if value is not None]
+        if selected:
+            selected.sort(key=len)
+            smallest, others = selected[0], selected[1:]
+            ordered = sorted((name, entry_room) for entry_room, name in smallest
+                             if all((entry_room, name) in other for other in others))
+        else:
+            ordered = self._names
+
+        start = 0
+        if cursor:
+            name, _, cursor_room = cursor.rpartition("/")
+            start = bisect_right(ordered, (name, cursor_room))
+        page = ordered[start:start + limit]
+        entries = [self._entries[(entry_room, name)] for name, entry_room in page]
+        has_more = start + limit < len(ordered)
+        next_cursor = f"{page[-1][0]}/{page[-1][1]}" if page and has_more else None
+        return entries, next_cursor
@@ -0,0 +1,395 @@
+"""Game 规则的随机不变量检查
+
+用法:
+    python fuzz.py --runs 100000                 # 在所有 CPU 核心上运行 10 万个随机操作序列
+    python fuzz.py --runs 1000000 --players 2 --actions 400
+    python fuzz.py --replay 12345                # 重放一个种子并打印每一步
+
+每个序列由种子完全确定：操作选择和骰子点数来自 random.Random(seed)；每次掷骰还带一个卡片种子，
+掷骰前用它初始化全局 random（卡片抽取使用全局 random），因此抽到的卡片只取决于这一步本身，
+操作序列可以单独重放。时间使用虚拟时钟，第 n 步的时刻为 n * CLOCK_TICK；拍卖计时器到期由 finish 操作代替。发现违反不变量时，先选出最小的失败种子，再删除操作、把点数换成更小的值，
+把序列缩减到仍能复现同一不变量的最短序列。
+
+检查的不变量：
+- money_conservation: 玩家现金总额的变化只来自银行流水（购买、拍卖成交、升级、抵押、赎回、出售、卡片、破产免债），
+  玩家之间的转账（租金、"向每位玩家支付"、交易）总额不变
+- ownership: 地块的 owner 与 player.properties 一致，无主地块没有房屋和抵押，房屋数在范围内
+- current_player: 游戏未结束时当前玩家仍在游戏中，待处理操作属于当前玩家所在地块
+- elimination: 已出局的玩家（无现金、无地块）不会重新获得现金
+- auction: 拍卖进行中时待处理操作为该拍卖，被拍卖的地块仍然无主
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from auction import AUCTION_MIN_BID_INTERVAL
+from game import Game, Property
+
+DEFAULT_RUNS = 10000
+DEFAULT_ACTIONS = 200  # 每个序列最多操作数
+DEFAULT_PLAYERS = 4
+CHUNK_SIZE = 500  # 每个工作进程一次处理的种子数
+TRANSFER_CARD = "向每位玩家支付"  # 玩家之间转账的卡片（而不是与银行）
+CLOCK_TICK = AUCTION_MIN_BID_INTERVAL  # 虚拟时钟每步前进的秒数
+MAX_BID_RAISE = 30  # 随机出价最多比最低出价高出的金额
+MAX_TRADE_CASH = 100  # 随机交易报价中一方给出的最多现金
+MAX_TRADE_PROPERTIES = 2  # 随机交易报价中一方给出的最多地块数
+
+Action = Tuple[Any, ...]
+Failure = Dict[str, Any]
+
+
+class IllegalAction(Exception):
+    """重放时操作在当前状态下不合法（缩减出的序列无效）"""
+
+
+def _is_active(player) -> bool:
+    return player.money > 0 or len(player.properties) > 0
+
+
+def legal_actions(game: Game) -> List[Tuple[str, Any, int]]:
+    """可以发出的操作及权重：(操作, 地块名、出价玩家或报价编号, 权重)，与服务器接受的请求一致
+
+    拍卖进行中时服务器拒绝掷骰和结束回合，只接受出价；地块操作仍由当前玩家发出。
+    交易不限于当前玩家，任意两名未出局玩家之间都可以发起、接受、拒绝或撤回报价。
+    """
+    player = game.get_current_player()
+    actions = []
+    if game.auction is not None:
+        for bidder in game.players:
+            if bidder.name in game.auction.bidders:
+                actions.append(("bid", bidder.name, 2))
+        actions.append(("finish", None, 2))
+    else:
+        if not game.has_rolled_this_turn:
+            actions.append(("roll", None, 12))
+        pending = game.pending_action
+        if pending is not None:
+            actions.append(("buy" if pending.get("action") == "prompt_buy" else "upgrade", None, 6))
+        actions.append(("end_turn", None, 4 if game.has_rolled_this_turn else 1))
+    for prop in player.properties:
+        if prop.is_mortgaged:
+            actions.append(("redeem", prop.name, 1))
+        else:
+            actions.append(("mortgage", prop.name, 1))
+        actions.append(("sell", prop.name, 1))
+    if sum(1 for p in game.players if _is_active(p)) >= 2:
+        actions.append(("propose", None, 2))
+    offer_ids = sorted({offer.offer_id for p in game.players for offer in game.trades.for_player(p.name)})
+    for offer_id in offer_ids:
+        actions.append(("accept", offer_id, 2))
+        actions.append(("reject", offer_id, 1))
+    return actions
+
+
+def _random_trade_side(player, rng: random.Random) -> Tuple[int, Tuple[str, ...]]:
+    """随机选出一方在交易中给出的现金和地块"""
+    cash = rng.choice((0, rng.randint(1, MAX_TRADE_CASH)))
+    names = [prop.name for prop in player.properties]
+    return cash, tuple(rng.sample(names, rng.randint(0, min(MAX_TRADE_PROPERTIES, len(names)))))
+
+
+def choose_action(game: Game, rng: random.Random) -> Action:
+    actions = legal_actions(game)
+    kind, name, _ = rng.choices(actions, weights=[weight for _, _, weight in actions])[0]
+    if kind == "roll":
+        return ("roll", rng.randint(1, 6) + rng.randint(1, 6), rng.getrandbits(32))
+    if kind == "bid":
+        return ("bid", name, game.auction.minimum_bid() + rng.randint(0, MAX_BID_RAISE))
+    if kind == "propose":
+        sender, receiver = rng.sample([p for p in game.players if _is_active(p)], 2)
+        give_cash, give_properties = _random_trade_side(sender, rng)
+        get_cash, get_properties = _random_trade_side(receiver, rng)
+        return ("propose", sender.name, receiver.name, give_cash, give_properties, get_cash, get_properties)
+    if kind == "accept":
+        return ("accept", game.trades.get(name).receiver, name)
+    if kind == "reject":
+        # 接收方拒绝或发起方撤回
+        offer = game.trades.get(name)
+        return ("reject", rng.choice((offer.sender, offer.receiver)), name)
+    if name is not None:
+        return (kind, name)
+    return (kind,)
+
+
+def _find_property(player, name: str) -> Optional[Property]:
+    return next((prop for prop in player.properties if prop.name == name), None)
+
+
+def apply_action(game: Game, action: Action, now: float) -> Tuple[Dict[str, Any], int]:
+    """按服务器处理该请求的方式调用 Game 执行一个操作，返回 (结果, 预期的银行流水)
+
+    预期银行流水是玩家现金总额应有的变化，玩家之间的转账不计入。
+    """
+    kind = action[0]
+    player = game.get_current_player()
+    if kind == "propose":
+        return game.propose_trade(*action[1:], now), 0
+    if kind == "accept":
+        # 交易只在玩家之间转移现金和地块
+        return game.accept_trade(action[1], action[2], now), 0
+    if kind == "reject":
+        return game.close_trade(action[1], action[2]), 0
+    if kind == "bid":
+        if game.auction is None:
+            raise IllegalAction(action)
+        error = game.place_bid(action[1], action[2], now)
+        return ({"error": error} if error else {}), 0
+    if kind == "finish":
+        # 拍卖计时器到期：最高价者向银行付款
+        if game.auction is None:
+            raise IllegalAction(action)
+        result = game.finish_auction()
+        winner = result.get("winner_bid")
+        return result, -winner["amount"] if winner else 0
+    if kind == "roll":
+        if game.has_rolled_this_turn or game.auction is not None:
+            raise IllegalAction(action)
+        money_before = player.money
+        random.seed(action[2])  # 本步抽卡结果只取决于操作自带的卡片种子
+        result = game.play_turn_network(action[1])
+        flow = 0
+        events = result.get("events")
+        if isinstance(events, str) and TRANSFER_CARD not in events:
+            # 卡片（结果中的 events 为卡片描述）：抽卡玩家与银行之间的流水
+            flow = player.money - money_before
+        debt = result.get("debt_situation")
+        if debt and not debt.get("can_recover", True):
+            flow += debt["debt"]  # 破产时剩余债务由银行免除
+        return result, flow
+    if kind == "buy":
+        pending = game.pending_action
+        if pending is None or pending.get("action") != "prompt_buy":
+            raise IllegalAction(action)
+        tile = game.board.tiles[player.position]
+        result = game.buy_property()
+        return result, 0 if "error" in result else -tile.cost[0]
+    if kind == "upgrade":
+        pending = game.pending_action
+        if pending is None or pending.get("action") != "prompt_upgrade":
+            raise IllegalAction(action)
+        tile = game.board.tiles[player.position]
+        houses = tile.houses
+        result = game.upgrade_property()
+        return result, 0 if "error" in result else -tile.cost[houses + 1]
+    if kind == "end_turn":
+        if game.auction is not None:
+            raise IllegalAction(action)
+        pending = game.pending_action
+        if pending is not None and pending.get("action") == "prompt_buy":
+            # 放弃购买：地块进入拍卖，结算后才切换到下一位玩家
+            return game.start_auction(now), 0
+        game.next_player()
+        game.pending_action = None
+        return {}, 0
+    prop = _find_property(player, action[1])
+    if prop is None:
+        raise IllegalAction(action)
+    if kind == "mortgage":
+        result = game.mortgage_property(prop.name)
+        return result, 0 if "error" in result else prop.mortgage_value
+    if kind == "redeem":
+        result = game.redeem_property(prop.name)
+        return result, 0 if "error" in result else -prop.mortgage_value
+    if kind == "sell":
+        value = prop.selling_price
+        result = game.sell_property(prop.name)
+        return result, 0 if "error" in result else value
+    raise IllegalAction(action)
+
+
+def check_invariants(game: Game, money_before: int, flow: int, eliminated: set) -> Optional[Tuple[str, str]]:
+    """检查所有不变量，返回 (不变量名, 说明) 或 None"""
+    total = sum(p.money for p in game.players)
+    if total - money_before != flow:
+        return ("money_conservation",
+                f"现金总额变化 {total - money_before}，银行流水应为 {flow}")
+
+    players = set(id(p) for p in game.players)
+    seen = set()
+    for player in game.players:
+        for prop in player.properties:
+            if prop.owner is not player:
+                return ("ownership", f"{prop.name} 在 {player.name} 的地块列表中，但 owner 为 "
+                                     f"{prop.owner.name if prop.owner else None}")
+            if id(prop) in seen:
+                return ("ownership", f"{prop.name} 同时属于多名玩家")
+            seen.add(id(prop))
+    for tile in game.board.tiles:
+        if not isinstance(tile, Property):
+            continue
+        if tile.owner is None:
+            if tile.houses or tile.is_mortgaged:
+                return ("ownership", f"无主地块 {tile.name} 有 {tile.houses} 栋房屋或处于抵押状态")
+        elif id(tile.owner) not in players or tile not in tile.owner.properties:
+            return ("ownership", f"{tile.name} 的 owner {tile.owner.name} 的地块列表中没有该地块")
+        if not (0 <= tile.houses <= tile.max_houses):
+            return ("ownership", f"{tile.name} 房屋数 {tile.houses} 超出范围")
+
+    if not (0 <= game.current_player_index < len(game.players)):
+        return ("current_player", f"当前玩家下标 {game.current_player_index} 越界")
+    current = game.get_current_player()
+    if not game.is_game_over() and not _is_active(current):
+        return ("current_player", f"当前玩家 {current.name} 已出局")
+    pending = game.pending_action
+    if pending is not None:
+        tile = game.board.tiles[current.position]
+        if tile.name != pending.get("property"):
+            return ("current_player", f"待处理操作 {pending} 不属于当前玩家 {current.name} 所在地块 {tile.name}")
+
+    for player in game.players:
+        if player.name in eliminated and _is_active(player):
+            return ("elimination", f"已出局的 {player.name} 重新获得了 ${player.money}")
+
+    auction = game.auction
+    if auction is not None:
+        if pending is None or pending.get("action") != "auction" or pending.get("property") != auction.property_name:
+            return ("auction", f"拍卖 {auction.property_name} 进行中，但待处理操作为 {pending}")
+        if game.board.properties_by_name[auction.property_name].owner is not None:
+            return ("auction", f"被拍卖的 {auction.property_name} 已有主人")
+    return None
+
+
+def run_trace(seed: int, players: int, actions: Optional[List[Action]] = None, max_actions: int = DEFAULT_ACTIONS,
+              verbose: bool = False) -> Tuple[List[Action], Optional[Failure]]:
+    """运行一个序列：给定 actions 时重放，否则随机生成；返回 (执行过的操作, 第一个失败)"""
+    rng = random.Random(seed)
+    game = Game([f"P{i + 1}" for i in range(players)])
+    eliminated: set = set()
+    trace: List[Action] = []
+    steps = len(actions) if actions is not None else max_actions
+    for step in range(steps):
+        if game.is_game_over():
+            break
+        action = actions[step] if actions is not None else choose_action(game, rng)
+        money_before = sum(p.money for p in game.players)
+        now = step * CLOCK_TICK
+        game.expire_trades(now)  # 与服务器的定时清理相同
+        result, flow = apply_action(game, action, now)
+        trace.append(action)
+        if verbose:
+            print(f"{step:>4} {game.players.index(game.get_current_player())} {action} "
+                  f"{[p.money for p in game.players]} {result.get('events', '')}")
+        violation = check_invariants(game, money_before, flow, eliminated)
+        if violation is not None:
+            return trace, {"seed": seed, "invariant": violation[0], "message": violation[1], "step": step}
+        eliminated.update(p.name for p in game.players if not _is_active(p))
+    return trace, None
+
+
+def reproduces(seed: int, players: int, actions: List[Action], invariant: str) -> bool:
+    try:
+        _, failure = run_trace(seed, players, actions)
+    except IllegalAction:
+        return False
+    return failure is not None and failure["invariant"] == invariant
+
+
+def shrink(failure: Failure, players: int, max_actions: int) -> Failure:
+    """把失败序列缩减到仍能复现同一不变量的最短操作序列：逐段删除操作，再把点数换成更小的值，直到无法缩减"""
+    seed, invariant = failure["seed"], failure["invariant"]
+    trace, _ = run_trace(seed, players, max_actions=max_actions)
+    actions = trace[:failure["step"] + 1]
+    changed = True
+    while changed:
+        changed = False
+        chunk = max(1, len(actions) // 2)
+        while chunk >= 1:
+            index = 0
+            removed = False
+            while index < len(actions):
+                candidate = actions[:index] + actions[index + chunk:]
+                if candidate and reproduces(seed, players, candidate, invariant):
+                    actions = candidate
+                    removed = changed = True
+                else:
+                    index += chunk
+            if not removed:
+                chunk //= 2
+        for index, action in enumerate(actions):
+            if action[0] != "roll":
+                continue
+            for total in range(2, action[1]):
+                candidate = actions[:index] + [("roll", total, action[2])] + actions[index + 1:]
+                if reproduces(seed, players, candidate, invariant):
+                    actions = candidate
+                    changed = True
+                    break
+    _, final = run_trace(seed, players, actions)
+    return dict(final, trace=actions, original_steps=failure["step"] + 1)
+
+
+def run_chunk(task: Tuple[int, int, int, int]) -> Tuple[int, int, Dict[str, Failure]]:
+    """工作进程：运行一段连续种子，返回 (序列数, 操作数, 每个不变量的最小失败种子)"""
+    start, count, players, max_actions = task
+    failures: Dict[str, Failure] = {}
+    total_actions = 0
+    for seed in range(start, start + count):
+        trace, failure = run_trace(seed, players, max_actions=max_actions)
+        total_actions += len(trace)
+        if failure is not None and failure["invariant"] not in failures:
+            failures[failure["invariant"]] = failure
+    return count, total_actions, failures
+
+
+def fuzz(runs: int, players: int = DEFAULT_PLAYERS, max_actions: int = DEFAULT_ACTIONS,
+         start_seed: int = 0, processes: Optional[int] = None) -> Dict[str, Any]:
+    """在多个进程中运行随机序列，返回统计和缩减后的失败"""
+    tasks = [(seed, min(CHUNK_SIZE, start_seed + runs - seed), players, max_actions)
+             for seed in range(start_seed, start_seed + runs, CHUNK_SIZE)]
+    failures: Dict[str, Failure] = {}
+    total_runs = total_actions = 0
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes or os.cpu_count()) as pool:
+        for count, actions, chunk_failures in pool.imap_unordered(run_chunk, tasks):
+            total_runs += count
+            total_actions += actions
+            for invariant, failure in chunk_failures.items():
+                if invariant not in failures or failure["seed"] < failures[invariant]["seed"]:
+                    failures[invariant] = failure
+        elapsed = time.perf_counter() - started
+        shrunk = pool.starmap(shrink, [(failure, players, max_actions) for failure in failures.values()])
+    return {
+        "runs": total_runs,
+        "actions": total_actions,
+        "elapsed_seconds": round(elapsed, 2),
+        "actions_per_second": round(total_actions / elapsed) if elapsed else 0,
+        "failures": sorted(shrunk, key=lambda f: f["invariant"]),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Game 规则不变量随机检查")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="随机序列数")
+    parser.add_argument("--actions", type=int, default=DEFAULT_ACTIONS, help="每个序列最多操作数")
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS, help="玩家人数（2-6）")
+    parser.add_argument("--start-seed", type=int, default=0, help="起始种子")
+    parser.add_argument("--processes", type=int, default=None, help="进程数，默认为 CPU 核心数")
+    parser.add_argument("--replay", type=int, default=None, help="重放指定种子并打印每一步")
+    args = parser.parse_args(argv)
+
+    if args.replay is not None:
+        _, failure = run_trace(args.replay, args.players, max_actions=args.actions, verbose=True)
+        print(failure or "未发现问题")
+        return 1 if failure else 0
+
+    report = fuzz(args.runs, args.players, args.actions, args.start_seed, args.processes)
+    print(f"序列 {report['runs']}，操作 {report['actions']}，耗时 {report['elapsed_seconds']}s，"
+          f"{report['actions_per_second']} 操作/秒")
+    if not report["failures"]:
+        print("未发现违反不变量的情况")
+        return 0
+    for failure in report["failures"]:
+        print(f"\n[{failure['invariant']}] 种子 {failure['seed']}: {failure['message']}")
+        print(f"  缩减后 {len(failure['trace'])} 步（原 {failure['original_steps']} 步）:")
+        for action in failure["trace"]:
+            print(f"    {action}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
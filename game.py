@@ -1,5 +1,11 @@
 import random
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
+from board_loader import BoardTemplate, load_board_template
+from auction import Auction
+from trades import TradeBook
+
+MIN_PLAYERS = 2
+MAX_PLAYERS = 6
 
 class Player:
     def __init__(self, name: str):
@@ -43,22 +49,66 @@ class Player:
             "redeemable_properties": [prop.name for prop in self.get_redeemable_properties()]
         }
 
+class PropertyGroup:
+    """颜色组：组内任一地块的主人或抵押状态变化时，重新判断是否为整组垄断并切换组内地块的租金表"""
+
+    def __init__(self, name: str, color: str):
+        self.name = name
+        self.color = color
+        self.properties: List["Property"] = []
+        self.monopoly_owner: Optional[Player] = None  # 拥有整组且均未抵押的玩家
+
+    def refresh(self):
+        owner = self.properties[0].owner
+        complete = owner is not None and all(p.owner is owner and not p.is_mortgaged for p in self.properties)
+        self.monopoly_owner = owner if complete else None
+        for prop in self.properties:
+            prop._select_rent_row(complete)
+
+
 class Property:
-    def __init__(self, name: str, cost: list[int], rent: List[int], mortgage_value: int, selling_price: int):
+    def __init__(self, name: str, cost: list[int], rent: List[int], mortgage_value: int, selling_price: int, max_houses: int = 3,
+                 monopoly_rent: Optional[Sequence[int]] = None, group: Optional[PropertyGroup] = None):
         self.name = name
         self.cost = cost
         self.rent = rent
         self.mortgage_value = mortgage_value
         self.selling_price = selling_price
-        self.owner: Optional[Player] = None
         self.houses = 0
-        self.max_houses = 3
+        self.max_houses = max_houses
+        # 预先计算的租金表：[是否整组垄断][房屋数]，抵押时使用全 0 行；落地收租只需一次查表
+        self._rent_rows = (tuple(rent), tuple(monopoly_rent if monopoly_rent is not None else rent))
+        self._no_rent = (0,) * len(rent)
+        self._rent_row = self._rent_rows[0]
+        self.has_monopoly = False
+        self.group = group
+        if group is not None:
+            group.properties.append(self)
+        self.owner: Optional[Player] = None
         self.is_mortgaged = False
 
+    def set_owner(self, owner: Optional[Player]):
+        """更换主人（不改动玩家的地产列表），并重新计算所在颜色组"""
+        self.owner = owner
+        self.state_changed()
+
+    def state_changed(self):
+        """主人或抵押状态变化后调用：重新计算所在颜色组（不属于任何组时只更新本地块）"""
+        if self.group is not None:
+            self.group.refresh()
+        else:
+            self._select_rent_row(False)
+
+    def _select_rent_row(self, monopoly: bool):
+        self.has_monopoly = monopoly
+        self._rent_row = self._no_rent if self.is_mortgaged else self._rent_rows[monopoly]
+
     def get_rent(self):
-        if self.is_mortgaged:
-            return 0
-        return self.rent[self.houses]
+        return self._rent_row[self.houses]
+
+    def rent_at(self, houses: int, monopoly: Optional[bool] = None) -> int:
+        """不考虑抵押时，指定房屋数的租金；monopoly 为 None 时按当前颜色组状态"""
+        return self._rent_rows[self.has_monopoly if monopoly is None else monopoly][houses]
 
     def can_upgrade(self):
         return self.owner is not None and self.houses < self.max_houses and not self.is_mortgaged
@@ -75,6 +125,7 @@ class Property:
         if self.owner and not self.is_mortgaged:
             self.owner.money += self.mortgage_value
             self.is_mortgaged = True
+            self.state_changed()
             return True
         return False
 
@@ -83,6 +134,7 @@ class Property:
         if self.owner and self.is_mortgaged and self.owner.money >= self.mortgage_value:
             self.owner.money -= self.mortgage_value
             self.is_mortgaged = False
+            self.state_changed()
             return True
         return False
 
@@ -91,9 +143,9 @@ class Property:
         if self.owner:
             self.owner.money += self.selling_price
             self.owner.properties.remove(self)
-            self.owner = None
             self.houses = 0
             self.is_mortgaged = False
+            self.set_owner(None)
             return True
         return False
 
@@ -106,15 +158,17 @@ class Property:
             "max_houses": self.max_houses,
             "is_mortgaged": self.is_mortgaged,
             "mortgage_value": self.mortgage_value,
-            "sell_value": self.selling_price
+            "sell_value": self.selling_price,
+            "rent": self._rent_row[self.houses] if self.owner is not None else 0
         }
 
 class EventCard:
-    def __init__(self, card_type: str, board_size: int = 28):
+    def __init__(self, card_type: str, board_size: int = 28, railroad_positions: Sequence[int] = ()):
         self.card_type = card_type  # "机遇" or "命运"
         self.name = card_type
         self.cost = [0]
         self.board_size = board_size
+        self.railroad_positions = railroad_positions  # 铁路站位置，由地图定义
 
     def trigger(self, player: Player):
         # 在触发时动态选择一张卡片
@@ -130,12 +184,10 @@ class EventCard:
             p.money += 200
         
         def move_to_nearest_railroad(p):
-            # 假设铁路站的位置（需要根据实际游戏板调整）
-            railroad_positions = [4, 5, 12, 20, 26]
             current_pos = p.position
             min_distance = float('inf')
-            nearest_railroad = 0
-            for railroad_pos in railroad_positions:
+            nearest_railroad = current_pos  # 地图没有铁路站时原地不动
+            for railroad_pos in self.railroad_positions:
                 distance = (railroad_pos - current_pos) % self.board_size
                 if distance < min_distance:
                     min_distance = distance
@@ -174,7 +226,7 @@ class EventCard:
             ("人寿保险到期，收取 $100", lambda p: setattr(p, 'money', p.money + 100)),
             ("假期基金到期，收取 $100", lambda p: setattr(p, 'money', p.money + 100)),
             ("您中了二等奖，收取 $10", lambda p: setattr(p, 'money', p.money + 10)),
-            ("您已被选为主席，向每位玩家支付 $50", lambda p: setattr(p, 'money', max(0, p.money - 150))),  # 简化处理
+            ("您已被选为主席，向每位玩家支付 $50", lambda p: None),  # 玩家之间的转账由 Game 处理
             ("从银行错误中收取 $200", lambda p: setattr(p, 'money', p.money + 200)),
             ("医生费用 $50", lambda p: setattr(p, 'money', max(0, p.money - 50))),
             ("学校税 $150", lambda p: setattr(p, 'money', max(0, p.money - 150))),
@@ -196,77 +248,43 @@ class EventCard:
         }
 
 class Board:
-    def __init__(self):
-        self.countries = {"country1":{"cost": [1, 2, 3, 4], "rent": [1, 2, 3, 4], "mortgage_value": 1, "selling_price": 2},
-                 "country2":{"cost": [2, 3, 4, 5], "rent": [2, 3, 4, 5], "mortgage_value": 1, "selling_price": 2},
-                 "country3":{"cost": [3, 4, 5, 6], "rent": [3, 4, 5, 6], "mortgage_value": 1, "selling_price": 2},
-                 "country4":{"cost": [4, 5, 6, 7], "rent": [4, 5, 6, 7], "mortgage_value": 1, "selling_price": 2},
-                 "country5":{"cost": [5, 6, 7, 8], "rent": [5, 6, 7, 8], "mortgage_value": 1, "selling_price": 2},
-                 "country6":{"cost": [6, 7, 8, 9], "rent": [6, 7, 8, 9], "mortgage_value": 1, "selling_price": 2},
-                 "country7":{"cost": [7, 8, 9, 10], "rent": [7, 8, 9, 10], "mortgage_value": 1, "selling_price": 2},
-                 "country8":{"cost": [8, 9, 10, 11], "rent": [8, 9, 10, 11], "mortgage_value": 1, "selling_price": 2},
-                 "country9":{"cost": [9, 10, 11, 12], "rent": [9, 10, 11, 12], "mortgage_value": 1, "selling_price": 2},
-                 "country10":{"cost": [10, 11, 12, 13], "rent": [10, 11, 12, 13], "mortgage_value": 1, "selling_price": 2},
-                 "country11":{"cost": [11, 12, 13, 14], "rent": [11, 12, 13, 14], "mortgage_value": 1, "selling_price": 2},
-                 "country12":{"cost": [12, 13, 14, 15], "rent": [12, 13, 14, 15], "mortgage_value": 1, "selling_price": 2},
-                 "country13":{"cost": [13, 14, 15, 16], "rent": [13, 14, 15, 16], "mortgage_value": 1, "selling_price": 2},
-                 "country14":{"cost": [14, 15, 16, 17], "rent": [14, 15, 16, 17], "mortgage_value": 1, "selling_price": 2},
-                 "country15":{"cost": [15, 16, 17, 18], "rent": [15, 16, 17, 18], "mortgage_value": 1, "selling_price": 2},
-                 "country16":{"cost": [16, 17, 18, 19], "rent": [16, 17, 18, 19], "mortgage_value": 1, "selling_price": 2},
-                 "country17":{"cost": [17, 18, 19, 20], "rent": [17, 18, 19, 20], "mortgage_value": 1, "selling_price": 2},
-                 "country18":{"cost": [18, 19, 20, 21], "rent": [18, 19, 20, 21], "mortgage_value": 1, "selling_price": 2},
-                 "country19":{"cost": [19, 20, 21, 22], "rent": [19, 20, 21, 22], "mortgage_value": 1, "selling_price": 2},
-                 "country20":{"cost": [20, 21, 22, 23], "rent": [20, 21, 22, 23], "mortgage_value": 1, "selling_price": 2},
-                 "country21":{"cost": [21, 22, 23, 24], "rent": [21, 22, 23, 24], "mortgage_value": 1, "selling_price": 2},
-                 "country22":{"cost": [22, 23, 24, 25], "rent": [22, 23, 24, 25], "mortgage_value": 1, "selling_price": 2},
-                 "country23":{"cost": [23, 24, 25, 26], "rent": [23, 24, 25, 26], "mortgage_value": 1, "selling_price": 2},
-                 "country24":{"cost": [24, 25, 26, 27], "rent": [24, 25, 26, 27], "mortgage_value": 1, "selling_price": 2},
-                 "country25":{"cost": [25, 26, 27, 28], "rent": [25, 26, 27, 28], "mortgage_value": 1, "selling_price": 2},
-                 "country26":{"cost": [26, 27, 28, 29], "rent": [26, 27, 28, 29], "mortgage_value": 1, "selling_price": 2},
-                 "country27":{"cost": [27, 28, 29, 30], "rent": [27, 28, 29, 30], "mortgage_value": 1, "selling_price": 2},
-                 "country28":{"cost": [28, 29, 30, 31], "rent": [28, 29, 30, 31], "mortgage_value": 1, "selling_price": 2},
-                 "country29":{"cost": [29, 30, 31, 32], "rent": [29, 30, 31, 32], "mortgage_value": 1, "selling_price": 2},
-                 "country30":{"cost": [30, 31, 32, 33], "rent": [30, 31, 32, 33], "mortgage_value": 1, "selling_price": 2},
-                 "country31":{"cost": [31, 32, 33, 34], "rent": [31, 32, 33, 34], "mortgage_value": 1, "selling_price": 2},
-                 "country32":{"cost": [32, 33, 34, 35], "rent": [32, 33, 34, 35], "mortgage_value": 1, "selling_price": 2},
-                 "country33":{"cost": [33, 34, 35, 36], "rent": [33, 34, 35, 36], "mortgage_value": 1, "selling_price": 2},
-                 "country34":{"cost": [34, 35, 36, 37], "rent": [34, 35, 36, 37], "mortgage_value": 1, "selling_price": 2}}
-        self.game_map = ["起点", "country1", "country2", "country3", "country4",
-                "country5", "country6", "机遇", "country7", "命运",
-                "country8", "机遇", "country9", "country10", "country11",
-                "country12", "country13", "country14", "country15",
-                "country16", "country17", "country18", "country19",
-                "country20", "country21", "country22", "country23","命运"]
+    def __init__(self, template: Optional[BoardTemplate] = None):
+        # 地图数据来自 maps 目录中的地图文件，编译后的模板由所有房间共享
+        self.template = template or load_board_template()
+        self.countries = self.template.countries
+        self.game_map = self.template.game_map
+        board_size = len(self.template.tiles)
+        self.groups = {name: PropertyGroup(name, group.color) for name, group in self.template.groups.items()}
         self.tiles = []
-        for tile_name in self.game_map:
-            if tile_name != "起点" and tile_name != "机遇" and tile_name != "命运":
-                cost = self.countries[tile_name]["cost"]
-                rent = self.countries[tile_name]["rent"]
-                mortgage_value = self.countries[tile_name]["mortgage_value"]
-                selling_price = self.countries[tile_name]["selling_price"]
-                self.tiles.append(Property(tile_name, cost, rent, mortgage_value, selling_price))
-            elif tile_name == "起点":
-                self.tiles.append(Property("起点", [0], [0], 0, 0))
-            elif tile_name == "机遇":
-                self.tiles.append(EventCard("机遇", len(self.game_map)))
-            elif tile_name == "命运":
-                self.tiles.append(EventCard("命运", len(self.game_map)))
+        for spec in self.template.tiles:
+            if spec.kind == "property":
+                self.tiles.append(Property(spec.name, list(spec.cost), list(spec.rent), spec.mortgage_value,
+                                           spec.selling_price, self.template.max_houses, spec.monopoly_rent,
+                                           self.groups.get(spec.group)))
+            elif spec.kind == "start":
+                self.tiles.append(Property(spec.name, [0], [0], 0, 0, self.template.max_houses))
+            else:
+                self.tiles.append(EventCard(spec.name, board_size, self.template.railroad_positions))
         self.size = len(self.tiles)
+        # 可交易地块按名称索引，交易校验时直接查主人
+        self.properties_by_name = {t.name: t for t in self.tiles if isinstance(t, Property) and t.cost[0] > 0}
 
     def move(self, player: Player, steps: int):
         player.position = (player.position + steps) % self.size
         return self.tiles[player.position]
 
 class Game:
-    def __init__(self, players: List[str]):
-        if not (2 <= len(players) <= 6):
+    def __init__(self, players: List[str], board_template: Optional[BoardTemplate] = None):
+        if not (MIN_PLAYERS <= len(players) <= MAX_PLAYERS):
             raise ValueError("Game must have 2 to 6 players.")
         self.players = [Player(name) for name in players]
-        self.board = Board()
+        self.board = Board(board_template)
         self.current_player_index = 0
         self.last_roll = 0
         self.pending_action = None
         self.has_rolled_this_turn = False  # 跟踪当前回合是否已掷骰子
+        self.auction: Optional[Auction] = None  # 进行中的拍卖，结束前回合不会切换
+        self.trades = TradeBook()  # 本房间玩家之间的未决交易报价
 
     def roll_dice(self):
         d1, d2 = random.randint(1, 6), random.randint(1, 6)
@@ -304,6 +322,7 @@ class Game:
                     rent = tile.get_rent()
                     player.money -= rent
                     tile.owner.money += rent
+                    result["rent"] = rent
                     result["events"].append(f"{player.name} paid ${rent} rent to {tile.owner.name}")
                     self.check_bankrupt(player, result)
                 else:
@@ -321,9 +340,12 @@ class Game:
             # 处理特殊的全体玩家支付效果
             if "向每位玩家支付" in desc:
                 amount = 50  # 从描述中提取金额
+                # 只付给仍在游戏中的玩家，现金不足时付完为止（负债时不付），转账前后现金总额不变
                 for other_player in self.players:
-                    if other_player != player:
-                        other_player.money += amount
+                    if other_player is not player and (other_player.money > 0 or other_player.properties):
+                        paid = max(0, min(amount, player.money))
+                        player.money -= paid
+                        other_player.money += paid
             self.check_bankrupt(player, result)
             self.next_player()
 
@@ -338,8 +360,9 @@ class Game:
     def buy_property(self) -> Dict[str, Any]:
         player = self.get_current_player()
         tile = self.board.tiles[player.position]
-        if isinstance(tile, Property) and tile.owner is None and tile.cost[0] > 0 and player.money >= tile.cost[0]:
-            tile.owner = player
+        if (self.auction is None and isinstance(tile, Property) and tile.owner is None and tile.cost[0] > 0
+                and player.money >= tile.cost[0]):
+            tile.set_owner(player)
             player.money -= tile.cost[0]
             player.properties.append(tile)
             result = {
@@ -369,6 +392,177 @@ class Game:
                 return result
         return {"error": "Cannot upgrade"}
 
+    def start_auction(self, now: float, **options) -> Dict[str, Any]:
+        """当前玩家放弃购买时，把该地块交给所有未出局玩家拍卖"""
+        if self.auction is not None:
+            return {"error": "拍卖正在进行"}
+        if not self.pending_action or self.pending_action.get("action") != "prompt_buy":
+            return {"error": "没有可以拍卖的地块"}
+        player = self.get_current_player()
+        tile = self.board.tiles[player.position]
+        bidders = [p.name for p in self.players if p.money > 0 or len(p.properties) > 0]
+        self.auction = Auction(tile.name, bidders, now, **options)
+        self.pending_action = {"action": "auction", "property": tile.name}
+        return {
+            "player": player.name,
+            "events": [f"{player.name} declined {tile.name}, auction started"],
+            "pending_action": self.pending_action,
+            "auction": self.auction.to_dict(now),
+        }
+
+    def place_bid(self, player_name: str, amount: Any, now: float) -> Optional[str]:
+        """拍卖出价，成功返回 None，否则返回错误信息"""
+        if self.auction is None:
+            return "当前没有进行中的拍卖"
+        player = next((p for p in self.players if p.name == player_name), None)
+        if player is None:
+            return "玩家不存在"
+        return self.auction.place_bid(player_name, amount, player.money, now)
+
+    def finish_auction(self) -> Dict[str, Any]:
+        """结算拍卖：最高价者付款获得地块（同价先出价者优先），其现金已不足时依次顺延；随后结束回合"""
+        auction, self.auction = self.auction, None
+        if auction is None:
+            return {"error": "当前没有进行中的拍卖"}
+        tile = self.board.properties_by_name[auction.property_name]
+        players = {p.name: p for p in self.players}
+        result = {"player": self.get_current_player().name, "events": [], "property": tile.name}
+        while tile.owner is None:
+            best = auction.book.best()
+            if best is None:
+                result["events"].append(f"No bids for {tile.name}, it stays with the bank")
+                break
+            winner = players[best.player]
+            if winner.money >= best.amount and (winner.money > 0 or winner.properties):
+                winner.money -= best.amount
+                tile.set_owner(winner)
+                winner.properties.append(tile)
+                result["winner_bid"] = {"player": winner.name, "amount": best.amount}
+                result["events"].append(f"{winner.name} won the auction for {tile.name} at ${best.amount}")
+            else:
+                auction.book.withdraw(best.player)
+
+        self.pending_action = None
+        self.next_player()
+        result["players"] = [p.to_dict() for p in self.players]
+        result["properties"] = [t.to_dict() for t in self.board.tiles if hasattr(t, 'to_dict')]
+        result["current_player"] = self.get_current_player().name
+        result["has_rolled_this_turn"] = self.has_rolled_this_turn
+        if self.is_game_over():
+            result["game_over"] = True
+            result["winner"] = self.get_winner().name
+        return result
+
+    def _find_player(self, name: Any) -> Optional[Player]:
+        return next((p for p in self.players if p.name == name), None)
+
+    def _validate_trade(self, sender_name: Any, receiver_name: Any, give_cash: Any, give_properties: Any,
+                        get_cash: Any, get_properties: Any) -> Optional[str]:
+        """按当前现金和地块主人校验交易，合法时返回 None"""
+        sender, receiver = self._find_player(sender_name), self._find_player(receiver_name)
+        if sender is None or receiver is None or sender is receiver:
+            return "交易对象无效"
+        for p in (sender, receiver):
+            if p.money <= 0 and not p.properties:
+                return f"{p.name} 已出局，不能交易"
+        for cash in (give_cash, get_cash):
+            if not isinstance(cash, int) or isinstance(cash, bool) or cash < 0:
+                return "现金必须是非负整数"
+        for names, owner in ((give_properties, sender), (get_properties, receiver)):
+            if (not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names)
+                    or len(set(names)) != len(names)):
+                return "地块列表无效"
+            for name in names:
+                prop = self.board.properties_by_name.get(name)
+                if prop is None or prop.owner is not owner:
+                    return f"{name} 不属于 {owner.name}"
+        if not (give_cash or get_cash or give_properties or get_properties):
+            return "交易内容不能为空"
+        if sender.money < give_cash:
+            return f"{sender.name} 现金不足"
+        if receiver.money < get_cash:
+            return f"{receiver.name} 现金不足"
+        # 交易不能让任何一方出局：出局和游戏结束只由破产处理
+        for p, cash_out, cash_in, properties_out, properties_in in (
+                (sender, give_cash, get_cash, give_properties, get_properties),
+                (receiver, get_cash, give_cash, get_properties, give_properties)):
+            if p.money - cash_out + cash_in <= 0 and len(p.properties) - len(properties_out) + len(properties_in) == 0:
+                return f"交易后 {p.name} 将没有现金和地块"
+        return None
+
+    def propose_trade(self, sender_name: str, receiver_name: str, give_cash: Any, give_properties: Any,
+                      get_cash: Any, get_properties: Any, now: float) -> Dict[str, Any]:
+        """发起交易报价：sender 给出现金和地块，换取 receiver 的现金和地块"""
+        if not self.trades.can_send(sender_name):
+            return {"error": f"未决报价最多 {self.trades.max_per_player} 份"}
+        error = self._validate_trade(sender_name, receiver_name, give_cash, give_properties, get_cash, get_properties)
+        if error:
+            return {"error": error}
+        offer = self.trades.add(sender_name, receiver_name, give_cash, tuple(give_properties),
+                                get_cash, tuple(get_properties), now)
+        return {"offer": offer.to_dict(now)}
+
+    def accept_trade(self, player_name: str, offer_id: Any, now: float) -> Dict[str, Any]:
+        """接受报价：重新校验后一次性完成现金和所有地块的交换"""
+        if not isinstance(offer_id, int) or isinstance(offer_id, bool):
+            return {"error": "报价编号必须是整数"}
+        offer = self.trades.get(offer_id)
+        if offer is None or offer.receiver != player_name:
+            return {"error": "报价不存在"}
+        if offer.expires_at <= now:
+            self.trades.remove(offer.offer_id)
+            return {"error": "报价已过期"}
+        error = self._validate_trade(offer.sender, offer.receiver, offer.give_cash, offer.give_properties,
+                                     offer.get_cash, offer.get_properties)
+        if error:
+            # 报价发出后现金或地块已变化，报价作废
+            self.trades.remove(offer.offer_id)
+            return {"error": f"报价已失效: {error}"}
+
+        sender, receiver = self._find_player(offer.sender), self._find_player(offer.receiver)
+        sender.money += offer.get_cash - offer.give_cash
+        receiver.money += offer.give_cash - offer.get_cash
+        moved = []
+        for names, old_owner, new_owner in ((offer.give_properties, sender, receiver),
+                                            (offer.get_properties, receiver, sender)):
+            for name in names:
+                prop = self.board.properties_by_name[name]
+                old_owner.properties.remove(prop)
+                new_owner.properties.append(prop)
+                prop.owner = new_owner
+                moved.append(prop)
+        # 所有地块换手后，每个受影响的颜色组只重新计算一次
+        refreshed = set()
+        for prop in moved:
+            key = prop.group if prop.group is not None else prop
+            if key not in refreshed:
+                refreshed.add(key)
+                prop.state_changed()
+        self.trades.remove(offer.offer_id)
+
+        return {
+            "player": player_name,
+            "events": [f"{offer.sender} traded with {offer.receiver}"],
+            "trade": offer.to_dict(now),
+            "players": [p.to_dict() for p in self.players],
+            "properties": [t.to_dict() for t in self.board.tiles if hasattr(t, 'to_dict')],
+        }
+
+    def close_trade(self, player_name: str, offer_id: Any) -> Dict[str, Any]:
+        """接收方拒绝或发起方撤回报价"""
+        if not isinstance(offer_id, int) or isinstance(offer_id, bool):
+            return {"error": "报价编号必须是整数"}
+        offer = self.trades.get(offer_id)
+        if offer is None or player_name not in (offer.sender, offer.receiver):
+            return {"error": "报价不存在"}
+        self.trades.remove(offer.offer_id)
+        reason = "cancelled" if player_name == offer.sender else "rejected"
+        return {"offer": offer.to_dict(offer.expires_at), "reason": reason}
+
+    def expire_trades(self, now: float) -> List[Dict[str, Any]]:
+        """移除过期报价，返回过期报价列表"""
+        return [offer.to_dict(now) for offer in self.trades.expire(now)]
+
     def mortgage_property(self, property_name: str) -> Dict[str, Any]:
         """抵押地块"""
         player = self.get_current_player()
@@ -454,13 +648,19 @@ class Game:
             ]
         }
 
+    @staticmethod
+    def _append_event(result: Dict[str, Any], event: str):
+        # 卡片结果的 events 是卡片描述字符串（客户端据此翻牌），债务信息只通过 debt_situation 返回
+        if isinstance(result["events"], list):
+            result["events"].append(event)
+
     def check_bankrupt(self, player: Player, result: Dict[str, Any]):
         """检查玩家是否破产"""
         if player.money < 0:
             debt = abs(player.money)
             if player.can_pay_debt(debt):
                 # 玩家有资产可以抵押或出售
-                result["events"].append(f"{player.name} has insufficient funds (${player.money}), needs to mortgage/sell properties")
+                self._append_event(result, f"{player.name} has insufficient funds (${player.money}), needs to mortgage/sell properties")
                 result["debt_situation"] = {
                     "player": player.name,
                     "debt": debt,
@@ -469,14 +669,15 @@ class Game:
                 }
             else:
                 # 玩家真正破产
-                result["events"].append(f"{player.name} has gone bankrupt!")
+                self._append_event(result, f"{player.name} has gone bankrupt!")
                 # 将所有地块归还银行
                 for prop in player.properties[:]:  # 使用副本避免修改列表时的问题
-                    prop.owner = None
                     prop.houses = 0
                     prop.is_mortgaged = False
+                    prop.set_owner(None)
                 player.properties.clear()
                 player.money = 0
+                self.trades.remove_player(player.name)
                 result["debt_situation"] = {
                     "player": player.name,
                     "debt": debt,
@@ -516,7 +717,9 @@ class Game:
             "current_player": self.get_current_player().name,
             "has_rolled_this_turn": self.has_rolled_this_turn,
             "pending_action": self.pending_action,
+            "auction": self.auction.to_dict() if self.auction else None,
             "last_roll": self.last_roll,
+            "board": self.board.template.name,
             "game_over": self.is_game_over(),
             "winner": self.get_winner().name if self.is_game_over() else None
         }
@@ -0,0 +1,174 @@
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from game import MAX_PLAYERS, MIN_PLAYERS
+
+RATING_BUCKET_WIDTH = 100  # 积分分桶宽度
+WIDEN_INTERVAL = 10.0  # 每等待该秒数，可接受的积分范围向两侧各扩大一个分桶
+MAX_RATING_SPREAD = 5  # 积分范围最多扩大的分桶数
+MAX_WAIT = 60.0  # 等待超过该秒数后，人数不足也以现有玩家开局（至少 MIN_PLAYERS 人）
+QUEUE_TIMEOUT = 300.0  # 等待超过该秒数仍未匹配则移出队列
+
+
+class QueueTicket:
+    """排队中的一名玩家"""
+
+    __slots__ = ("name", "rating", "players", "enqueued_at", "bucket", "active")
+
+    def __init__(self, name: str, rating: float, players: int, enqueued_at: float, bucket: Tuple[int, int]):
+        self.name = name
+        self.rating = rating
+        self.players = players  # 期望的对局人数
+        self.enqueued_at = enqueued_at
+        self.bucket = bucket  # (期望人数, 积分分桶)
+        self.active = True
+
+
+class Match(NamedTuple):
+    """匹配成功的一组玩家，按排队先后排列"""
+    players: Tuple[str, ...]
+    average_rating: float
+    created_at: float
+
+
+class MatchmakingQueue:
+    """按积分和期望人数分桶的匹配队列
+
+    每个 (期望人数, 积分分桶) 是一个先进先出队列；匹配时只查看附近固定数量的分桶，
+    等待时间由一个按下次检查时间排序的堆驱动，入队和每次检查都是 O(log n)。
+    等待越久可接受的积分范围越大，超过 max_wait 后人数不足也开局，超过 timeout 则移出队列。
+    """
+
+    def __init__(
+        self,
+        on_match: Callable[[Match], None],
+        on_expire: Optional[Callable[[QueueTicket], None]] = None,
+        bucket_width: int = RATING_BUCKET_WIDTH,
+        widen_interval: float = WIDEN_INTERVAL,
+        max_spread: int = MAX_RATING_SPREAD,
+        max_wait: float = MAX_WAIT,
+        timeout: float = QUEUE_TIMEOUT,
+    ):
+        self.on_match = on_match
+        self.on_expire = on_expire
+        self.bucket_width = bucket_width
+        self.widen_interval = widen_interval
+        self.max_spread = max_spread
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._tickets: Dict[str, QueueTicket] = {}
+        self._buckets: Dict[Tuple[int, int], "OrderedDict[str, QueueTicket]"] = {}
+        self._checks: List[Tuple[float, int, QueueTicket]] = []  # (下次检查时间, 序号, 玩家)
+        self._counter = itertools.count()
+        self.matches_formed = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tickets
+
+    def enqueue(self, name: str, rating: float, players: int, now: Optional[float] = None) -> QueueTicket:
+        """加入队列并立即尝试匹配"""
+        if not (MIN_PLAYERS <= players <= MAX_PLAYERS):
+            raise ValueError(f"对局人数必须在 {MIN_PLAYERS} 到 {MAX_PLAYERS} 之间")
+        if name in self._tickets:
+            raise ValueError("玩家已在匹配队列中")
+        now = time.monotonic() if now is None else now
+        ticket = QueueTicket(name, rating, players, now, (players, int(rating // self.bucket_width)))
+        self._tickets[name] = ticket
+        self._buckets.setdefault(ticket.bucket, OrderedDict())[name] = ticket
+        if not self._try_match(ticket, now):
+            self._schedule(ticket, now)
+        return ticket
+
+    def cancel(self, name: str) -> bool:
+        """退出队列（堆中的检查项在到期时丢弃）"""
+        ticket = self._tickets.get(name)
+        if ticket is None:
+            return False
+        self._remove(ticket)
+        return True
+
+    def tick(self, now: Optional[float] = None):
+        """处理到期的检查：扩大积分范围重新匹配，或移出超时的玩家"""
+        now = time.monotonic() if now is None else now
+        while self._checks and self._checks[0][0] <= now:
+            _, _, ticket = heapq.heappop(self._checks)
+            if not ticket.active:
+                continue
+            if now - ticket.enqueued_at >= self.timeout:
+                self._remove(ticket)
+                self.expired += 1
+                if self.on_expire is not None:
+                    self.on_expire(ticket)
+            elif not self._try_match(ticket, now):
+                self._schedule(ticket, now)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._tickets),
+            "buckets": len(self._buckets),
+            "matches_formed": self.matches_formed,
+            "expired": self.expired,
+        }
+
+    def _schedule(self, ticket: QueueTicket, now: float):
+        """安排下一次检查：下一次扩大积分范围、达到 max_wait 或超时，取最早者"""
+        waited = now - ticket.enqueued_at
+        deadlines = [ticket.enqueued_at + self.timeout]
+        steps = int(waited // self.widen_interval)
+        if steps < self.max_spread:
+            deadlines.append(ticket.enqueued_at + (steps + 1) * self.widen_interval)
+        if waited < self.max_wait:
+            deadlines.append(ticket.enqueued_at + self.max_wait)
+        heapq.heappush(self._checks, (min(deadlines), next(self._counter), ticket))
+
+    def _remove(self, ticket: QueueTicket):
+        ticket.active = False
+        self._tickets.pop(ticket.name, None)
+        bucket = self._buckets.get(ticket.bucket)
+        if bucket is not None:
+            bucket.pop(ticket.name, None)
+            if not bucket:
+                del self._buckets[ticket.bucket]
+
+    def _try_match(self, ticket: QueueTicket, now: float) -> bool:
+        """在 ticket 可接受的积分范围内凑齐一桌，成功时移出队列并回调 on_match"""
+        waited = now - ticket.enqueued_at
+        spread = min(self.max_spread, int(waited // self.widen_interval))
+        size, center = ticket.bucket
+
+        group = [ticket]
+        for distance in range(spread + 1):
+            for offset in ((0,) if distance == 0 else (-distance, distance)):
+                bucket = self._buckets.get((size, center + offset))
+                if not bucket:
+                    continue
+                for candidate in bucket.values():
+                    if candidate is not ticket:
+                        group.append(candidate)
+                        if len(group) == size:
+                            break
+                if len(group) == size:
+                    break
+            if len(group) == size:
+                break
+
+        if len(group) < size and (waited < self.max_wait or len(group) < MIN_PLAYERS):
+            return False
+
+        group.sort(key=lambda t: t.enqueued_at)
+        for member in group:
+            self._remove(member)
+        self.matches_formed += 1
+        self.on_match(Match(
+            players=tuple(member.name for member in group),
+            average_rating=round(sum(member.rating for member in group) / len(group), 2),
+            created_at=now,
+        ))
+        return True
@@ -0,0 +1,283 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from game import Game
+
+DEFAULT_RATING = 1500.0
+ELO_K_FACTOR = 32.0
+READ_POOL_SIZE = 4  # 只读连接池大小
+LEADERBOARD_CACHE_SIZE = 100  # 缓存的排行榜条数
+WRITE_BATCH_SIZE = 64  # 每个事务最多写入的对局数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    rating REAL NOT NULL,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    total_assets INTEGER NOT NULL DEFAULT 0,
+    best_assets INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_players_rating ON players (rating DESC, name);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT UNIQUE,
+    finished_at REAL NOT NULL,
+    board TEXT,
+    winner TEXT,
+    player_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_finished_at ON matches (finished_at);
+CREATE TABLE IF NOT EXISTS match_players (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    player TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    final_money INTEGER NOT NULL,
+    final_assets INTEGER NOT NULL,
+    properties INTEGER NOT NULL,
+    rating_before REAL NOT NULL,
+    rating_after REAL NOT NULL,
+    PRIMARY KEY (match_id, player)
+);
+CREATE INDEX IF NOT EXISTS idx_match_players_player ON match_players (player, match_id DESC);
+"""
+
+
+def build_match_result(game: Game, game_id: str) -> Dict[str, Any]:
+    """从结束的游戏中提取对局结果：胜者排第一，其余按总资产排名"""
+    winner = game.get_winner()
+    others = sorted((p for p in game.players if p is not winner),
+                    key=lambda p: p.get_total_asset_value(), reverse=True)
+    return {
+        "game_id": game_id,
+        "finished_at": time.time(),
+        "board": game.board.template.name,
+        "winner": winner.name,
+        "players": [
+            {
+                "name": p.name,
+                "rank": rank,
+                "final_money": p.money,
+                "final_assets": p.get_total_asset_value(),
+                "properties": len(p.properties),
+            }
+            for rank, p in enumerate([winner] + others, start=1)
+        ],
+    }
+
+
+def compute_elo(ratings: Dict[str, float], ranks: Dict[str, int], k_factor: float = ELO_K_FACTOR) -> Dict[str, float]:
+    """多人 Elo：按名次两两比较，K 值按对手数平均"""
+    names = list(ratings)
+    if len(names) < 2:
+        return dict(ratings)
+    k = k_factor / (len(names) - 1)
+    updated = {}
+    for name in names:
+        delta = 0.0
+        for other in names:
+            if other == name:
+                continue
+            expected = 1.0 / (1.0 + 10 ** ((ratings[other] - ratings[name]) / 400.0))
+            if ranks[name] < ranks[other]:
+                score = 1.0
+            elif ranks[name] > ranks[other]:
+                score = 0.0
+            else:
+                score = 0.5
+            delta += k * (score - expected)
+        updated[name] = round(ratings[name] + delta, 2)
+    return updated
+
+
+class ProfileStore:
+    """玩家档案、对局历史和排行榜
+
+    写入由后台线程批量提交（一个事务写入多局结果），submit_result() 只把结果放入队列，不阻塞事件循环；
+    查询使用只读连接池，通过 asyncio.to_thread 在线程中执行。排行榜前 N 名缓存到下一次写入为止。
+    """
+
+    def __init__(self, db_path: str = "monopoly.db"):
+        self.db_path = db_path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._pool_created = 0
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._leaderboard_cache: Optional[List[Dict[str, Any]]] = None
+        self._leaderboard_cache_version = -1
+        self._version = 0  # 每次写入事务提交后递增，用于判断排行榜缓存是否过期
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn = self._connect()
+            try:
+                conn.executescript(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    # ---- 写入 ----
+
+    def submit_result(self, result: Dict[str, Any]):
+        """提交一局结果（不阻塞），由后台线程写入"""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name="profile-writer", daemon=True)
+            self._writer.start()
+        self._queue.put_nowait(result)
+
+    def _writer_loop(self):
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            running = True
+            while running:
+                batch = [self._queue.get()]
+                while len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    running = False
+                    batch = [r for r in batch if r is not None]
+                if not batch:
+                    continue
+                try:
+                    with conn:
+                        for result in batch:
+                            self._write_result(conn, result)
+                    self._version += 1
+                except Exception as e:
+                    print(f"对局结果写入失败 ({type(e).__name__}): {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_result(conn: sqlite3.Connection, result: Dict[str, Any]):
+        players = result["players"]
+        names = [p["name"] for p in players]
+        placeholders = ",".join("?" * len(names))
+        ratings = {name: DEFAULT_RATING for name in names}
+        for row in conn.execute(f"SELECT name, rating FROM players WHERE name IN ({placeholders})", names):
+            ratings[row["name"]] = row["rating"]
+        new_ratings = compute_elo(ratings, {p["name"]: p["rank"] for p in players})
+
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO matches (game_id, finished_at, board, winner, player_count) VALUES (?, ?, ?, ?, ?)",
+            (result["game_id"], result["finished_at"], result.get("board"), result["winner"], len(players)),
+        )
+        if cursor.rowcount == 0:
+            return  # 同一局结果重复提交
+        match_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO match_players (match_id, player, rank, final_money, final_assets, properties, rating_before, rating_after) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(match_id, p["name"], p["rank"], p["final_money"], p["final_assets"], p["properties"],
+              ratings[p["name"]], new_ratings[p["name"]]) for p in players],
+        )
+        conn.executemany(
+            "INSERT INTO players (name, rating, games, wins, total_assets, best_assets, updated_at) "
+            "VALUES (?, ?, 1, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET rating = excluded.rating, games = games + 1, "
+            "wins = wins + excluded.wins, total_assets = total_assets + excluded.total_assets, "
+            "best_assets = MAX(best_assets, excluded.best_assets), updated_at = excluded.updated_at",
+            [(p["name"], new_ratings[p["name"]], 1 if p["rank"] == 1 else 0, p["final_assets"], p["final_assets"],
+              result["finished_at"]) for p in players],
+        )
+
+    def close(self, timeout: float = 5.0):
+        """写完队列中的结果并关闭所有连接"""
+        if self._writer is not None:
+            self._queue.put_nowait(None)
+            self._writer.join(timeout)
+            self._writer = None
+        while not self._read_pool.empty():
+            self._read_pool.get_nowait().close()
+
+    # ---- 查询 ----
+
+    @contextmanager
+    def _reader(self):
+        """从连接池借用一个只读连接"""
+        self._ensure_schema()
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._pool_created < READ_POOL_SIZE
+                if create:
+                    self._pool_created += 1
+            conn = self._connect() if create else self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    def _query_leaderboard(self) -> List[Dict[str, Any]]:
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT name, rating, games, wins, best_assets FROM players ORDER BY rating DESC, name LIMIT ?",
+                (LEADERBOARD_CACHE_SIZE,),
+            ).fetchall()
+        return [dict(row, rank=rank) for rank, row in enumerate(rows, start=1)]
+
+    async def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """排行榜前 limit 名（limit 不超过缓存大小时直接使用缓存）"""
+        limit = max(1, min(limit, LEADERBOARD_CACHE_SIZE))
+        version = self._version
+        if self._leaderboard_cache is None or self._leaderboard_cache_version != version:
+            self._leaderboard_cache = await asyncio.to_thread(self._query_leaderboard)
+            self._leaderboard_cache_version = version
+        return self._leaderboard_cache[:limit]
+
+    def _query_profile(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT name, rating, games, wins, total_assets, best_assets, updated_at FROM players WHERE name = ?",
+                (name,),
+            ).fetchone()
+            if row is None:
+                return None
+            profile = dict(row)
+            profile["rank"] = conn.execute(
+                "SELECT COUNT(*) + 1 FROM players WHERE rating > ?", (row["rating"],)
+            ).fetchone()[0]
+        profile["win_rate"] = round(profile["wins"] / profile["games"], 3) if profile["games"] else 0.0
+        profile["average_assets"] = round(profile["total_assets"] / profile["games"], 1) if profile["games"] else 0.0
+        return profile
+
+    async def get_profile(self, name: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._query_profile, name)
+
+    def _query_history(self, name: str, limit: int) -> List[Dict[str, Any]]:
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT m.game_id, m.finished_at, m.board, m.winner, m.player_count, mp.rank, mp.final_money, "
+                "mp.final_assets, mp.properties, mp.rating_before, mp.rating_after "
+                "FROM match_players mp JOIN matches m ON m.id = mp.match_id "
+                "WHERE mp.player = ? ORDER BY mp.match_id DESC LIMIT ?",
+                (name, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    async def get_history(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._query_history, name, max(1, min(limit, 100)))
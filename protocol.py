@@ -0,0 +1,217 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from board_loader import BoardTemplate, load_board_template
+from game import Game
+
+try:
+    import msgpack
+except ImportError:  # 未安装 msgpack 时，紧凑协议退回为紧凑 JSON 文本帧
+    msgpack = None
+
+PROTOCOL_JSON = "json"  # 默认协议：原始 JSON 消息
+PROTOCOL_PACKED = "packed"  # 紧凑协议：整数索引 + 打包数组（有 msgpack 时为二进制帧）
+SUPPORTED_PROTOCOLS = (PROTOCOL_JSON, PROTOCOL_PACKED)
+
+# 消息字段编码表：已知字段编码为其在表中的下标，未知字段保留原字符串
+MESSAGE_KEYS = [
+    "type", "player", "players", "properties", "events", "current_player",
+    "has_rolled_this_turn", "pending", "pending_action", "landed_on", "dice_total",
+    "dice_values", "game_over", "winner", "debt_situation", "message", "error",
+    "last_roll", "host", "player_colors", "available_colors", "remaining_players",
+    "new_host", "disconnect_reason", "color", "money", "total_asset_value",
+    "mortgageable_properties", "redeemable_properties", "sellable_properties",
+    "name", "mortgage_value", "redeem_cost", "sell_value", "debt", "can_recover",
+    "financial_options", "action", "property", "roster", "event", "seq",
+    "game_started", "board", "board_static", "rent", "auction", "best_bid", "best_bidder",
+    "minimum_bid", "bids", "ends_in", "winner_bid", "amount", "trade", "offer", "offers",
+    "offer_id", "from", "to", "give_cash", "give_properties", "get_cash", "get_properties",
+    "expires_in", "reason",
+]
+
+# 消息类型编码表
+MESSAGE_TYPES = [
+    "game_started", "game_reconnect", "turn_result", "buy_result", "upgrade_result",
+    "mortgage_result", "redeem_result", "sell_result", "turn_ended", "financial_options",
+    "player_list", "player_left", "color_selected", "error", "pong", "protocol",
+    "game_resumed", "spectator_snapshot", "advice", "auction_started", "auction_update",
+    "auction_result", "bid_accepted", "trade_offer", "trade_result", "trade_closed", "trade_list",
+]
+
+# 事件模板表：{p} 为玩家下标，{t} 为地块下标，{n} 为整数；无法匹配的事件保留原字符串
+EVENT_TEMPLATES = [
+    "{p} paid ${n} rent to {p}",
+    "{t} is mortgaged, no rent charged",
+    "{p} bought {t}",
+    "{p} upgraded {t} to {n} houses",
+    "{p} mortgaged {t} for ${n}",
+    "{p} redeemed {t} for ${n}",
+    "{p} sold {t} for ${n}",
+    "{p} has insufficient funds (${n}), needs to mortgage/sell properties",
+    "{p} has gone bankrupt!",
+    "{p} 主动结束了回合，轮到 {p}",
+    "获得银行股息 $50",
+    "前往起点，领取 $200",
+    "银行错误，您获得 $200",
+    "医生费用 $50",
+    "所得税退税 $20",
+    "马路维修费用，每栋房屋 $25",
+    "慈善捐款 $100",
+    "前往最近的铁路站",
+    "人寿保险到期，收取 $100",
+    "假期基金到期，收取 $100",
+    "您中了二等奖，收取 $10",
+    "您已被选为主席，向每位玩家支付 $50",
+    "从银行错误中收取 $200",
+    "学校税 $150",
+    "房屋维修，每栋房屋 $40",
+    "{p} declined {t}, auction started",
+    "{p} won the auction for {t} at ${n}",
+    "No bids for {t}, it stays with the bank",
+    "{p} traded with {p}",
+]
+
+_PLACEHOLDER = re.compile(r"\{([ptn])\}")
+_ARG_PATTERNS = {"p": r"(.+?)", "t": r"(.+?)", "n": r"(-?\d+)"}
+
+
+def _compile_template(template: str) -> Tuple[re.Pattern, List[str]]:
+    """将事件模板编译为正则表达式和参数类型列表"""
+    parts = _PLACEHOLDER.split(template)
+    pattern = "".join(
+        _ARG_PATTERNS[part] if i % 2 else re.escape(part)
+        for i, part in enumerate(parts)
+    )
+    return re.compile(pattern), parts[1::2]
+
+
+_COMPILED_TEMPLATES = [_compile_template(t) for t in EVENT_TEMPLATES]
+_EXACT_TEMPLATES = {t: code for code, t in enumerate(EVENT_TEMPLATES) if not _PLACEHOLDER.search(t)}
+_KEY_CODES = {key: code for code, key in enumerate(MESSAGE_KEYS)}
+_TYPE_CODES = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+
+_board_static: Dict[str, List[list]] = {}  # 按地图模板摘要缓存
+
+
+def get_board_static(template: BoardTemplate) -> List[list]:
+    """获取棋盘静态信息：[名称, 价格表, 最大房屋数, 抵押价值, 出售价值, 颜色组颜色]，每个地图只计算一次"""
+    static = _board_static.get(template.digest)
+    if static is None:
+        static = []
+        for tile in template.tiles:
+            if tile.kind == "event":
+                static.append([tile.name, [0], 0, None, None, None])
+            else:
+                color = template.groups[tile.group].color if tile.group is not None else None
+                static.append([tile.name, list(tile.cost), template.max_houses, tile.mortgage_value, tile.selling_price,
+                               color])
+        _board_static[template.digest] = static
+    return static
+
+
+def get_protocol_hello(game: Optional[Game] = None) -> Dict[str, Any]:
+    """连接建立时发送给紧凑协议客户端的编码表，客户端据此解码后续消息"""
+    template = game.board.template if game else load_board_template()
+    return {
+        "type": "protocol",
+        "protocol": PROTOCOL_PACKED,
+        "binary": msgpack is not None,
+        "keys": MESSAGE_KEYS,
+        "types": MESSAGE_TYPES,
+        "events": EVENT_TEMPLATES,
+        "board": get_board_static(template),
+    }
+
+
+class MessagePacker:
+    """将游戏消息打包为紧凑结构：玩家和地块用整数下标表示，事件用模板编号加参数表示"""
+
+    def __init__(self, game: Optional[Game]):
+        self.roster = [p.name for p in game.players] if game else []
+        self.player_index = {name: i for i, name in enumerate(self.roster)}
+        self.board = get_board_static(game.board.template if game else load_board_template())
+        self.tile_index = {row[0]: i for i, row in enumerate(self.board)}
+
+    def pack(self, message: Dict[str, Any]) -> Dict[Union[int, str], Any]:
+        packed = {}
+        for key, value in message.items():
+            if key == "type":
+                value = _TYPE_CODES.get(value, value)
+            elif key == "players" and value and isinstance(value[0], dict):
+                value = [self._pack_player(p) for p in value]
+            elif key == "properties" and value and isinstance(value[0], dict):
+                value = [self._pack_property(t) for t in value]
+            elif key == "events":
+                if isinstance(value, str):
+                    key, value = "event", self._pack_event(value)
+                else:
+                    value = [self._pack_event(e) for e in value]
+            elif key in ("player", "current_player", "winner"):
+                value = self.player_index.get(value, value)
+            elif key == "landed_on":
+                value = self.tile_index.get(value, value)
+            elif isinstance(value, dict):
+                value = self.pack(value)
+            packed[_KEY_CODES.get(key, key)] = value
+        if message.get("type") in ("game_started", "game_reconnect", "game_resumed", "spectator_snapshot"):
+            packed[_KEY_CODES["roster"]] = self.roster
+            packed[_KEY_CODES["board_static"]] = self.board
+        return packed
+
+    def _pack_player(self, player: Dict[str, Any]) -> list:
+        """玩家行：[金钱, 位置, 总资产, 地块下标列表, 已抵押地块下标列表]"""
+        return [
+            player["money"],
+            player["position"],
+            player["total_asset_value"],
+            [self.tile_index[name] for name in player["properties"]],
+            [self.tile_index[name] for name in player["redeemable_properties"]],
+        ]
+
+    def _pack_property(self, tile: Dict[str, Any]) -> list:
+        """地块行：[拥有者下标(-1 表示无主), 房屋数, 是否抵押, 当前租金]"""
+        owner = tile["owner"]
+        return [
+            self.player_index.get(owner, -1) if owner is not None else -1,
+            tile["houses"],
+            1 if tile.get("is_mortgaged") else 0,
+            tile.get("rent", 0),
+        ]
+
+    def _pack_event(self, event: Any) -> Any:
+        """事件：[模板编号, 参数...]，无法匹配时保留原值"""
+        if not isinstance(event, str):
+            return event
+        code = _EXACT_TEMPLATES.get(event)
+        if code is not None:
+            return [code]
+        for code, (pattern, kinds) in enumerate(_COMPILED_TEMPLATES):
+            if not kinds:
+                continue
+            match = pattern.fullmatch(event)
+            if not match:
+                continue
+            args = [code]
+            for kind, raw in zip(kinds, match.groups()):
+                if kind == "n":
+                    args.append(int(raw))
+                elif kind == "p" and raw in self.player_index:
+                    args.append(self.player_index[raw])
+                elif kind == "t" and raw in self.tile_index:
+                    args.append(self.tile_index[raw])
+                else:
+                    break
+            else:
+                return args
+        return event
+
+
+def encode_message(message: Dict[str, Any], game: Optional[Game], protocol: str) -> Union[str, bytes]:
+    """按协议编码消息：JSON 协议返回文本，紧凑协议返回 msgpack 二进制（不可用时为紧凑 JSON 文本）"""
+    if protocol != PROTOCOL_PACKED:
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+    packed = MessagePacker(game).pack(message)
+    if msgpack is not None:
+        return msgpack.packb(packed, use_bin_type=True)
+    return json.dumps(packed, ensure_ascii=False, separators=(",", ":"))
@@ -1,20 +1,63 @@
+import argparse
+import importlib.util
+import os
 import subprocess
 import sys
+import time
 
-def start_server():
+def has_module(name: str) -> bool:
+    """检查可选依赖是否已安装（不导入）"""
+    return importlib.util.find_spec(name) is not None
+
+def build_command(args) -> list:
+    """生成 uvicorn 启动命令"""
+    command = [
+        sys.executable, "-m", "uvicorn",
+        "server:app",
+        "--host", args.host,  # 0.0.0.0 允许所有IP访问
+        "--port", str(args.port),
+        "--ws-ping-interval", "20",  # 协议层 ping 帧间隔（秒）
+        "--ws-ping-timeout", "20"    # 未收到 pong 帧即断开失效连接
+    ]
+    if args.production:
+        # 生产模式：不监视文件，安装了 uvloop / httptools 时使用更快的事件循环和 HTTP 解析器
+        command += [
+            "--workers", str(args.workers),
+            "--loop", "uvloop" if has_module("uvloop") else "asyncio",
+            "--http", "httptools" if has_module("httptools") else "h11",
+        ]
+    else:
+        command.append("--reload")  # 开发模式：文件变化时自动重启
+    return command
+
+def start_server(args):
     """启动FastAPI服务器"""
+    command = build_command(args)
+    if args.production:
+        print(f"生产模式启动: workers={args.workers}, loop={command[command.index('--loop') + 1]}, "
+              f"http={command[command.index('--http') + 1]}")
+    # 记录启动时刻，服务器就绪后据此计算启动耗时
+    env = dict(os.environ, MONOPOLY_LAUNCH_TIME=str(time.time()))
     try:
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "server:app", 
-            "--reload",
-            "--host", "0.0.0.0",  # 允许所有IP访问
-            "--port", "8000"      # 明确指定端口
-        ], check=True)
+        subprocess.run(command, check=True, env=env)
     except subprocess.CalledProcessError as e:
         print(f"服务器启动失败: {e}")
     except KeyboardInterrupt:
         print("\n服务器已停止")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="启动大富翁游戏服务器")
+    parser.add_argument("--production", "--prod", action="store_true",
+                        help="生产模式：关闭自动重载，可用时使用 uvloop / httptools")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker 进程数（仅生产模式），目前只支持 1：房间状态保存在进程内")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址，默认 0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口，默认 8000")
+    args = parser.parse_args(argv)
+    if args.workers != 1:
+        # 房间、连接和对局都是进程内的全局状态，多个 worker 会把同一房间的玩家分到互不相通的进程
+        parser.error("--workers 只支持 1：房间状态保存在单个进程内，多个 worker 会拆散同一房间的玩家")
+    return args
+
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    start_server(parse_args())
@@ -1,26 +1,125 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
-from game import Game, Board
-from typing import Dict
+from fastapi.responses import HTMLResponse
+from game import Game
+from board_loader import DEFAULT_BOARD_NAME, list_boards, load_board_template
+from protocol import PROTOCOL_JSON, PROTOCOL_PACKED, SUPPORTED_PROTOCOLS, encode_message, get_board_static, get_protocol_hello
+from spectators import SpectatorHub
+from static_assets import StaticAssets
+from connection_index import ROOM_MAIN, ROOM_MATCHMAKING, STATE_LOBBY, STATE_PLAYING, STATE_QUEUED, ConnectionIndex
+from profiles import DEFAULT_RATING, ProfileStore, build_match_result
+from matchmaking import Match, MatchmakingQueue, QueueTicket
+from auction import AUCTION_TICK_INTERVAL
+from trades import TRADE_SWEEP_INTERVAL
+from typing import Dict, Optional, Set
+from collections import deque
+from contextlib import asynccontextmanager
 import os
 import asyncio
 import time
 from datetime import datetime
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动/停止全局后台任务"""
+    prewarm_board_templates()
+    await asyncio.to_thread(static_assets.refresh)
+    sweeper = asyncio.create_task(heartbeat_sweeper())
+    matchmaking_task = asyncio.create_task(matchmaking_loop())
+    static_watcher = asyncio.create_task(static_assets_watcher())
+    trade_sweeper = asyncio.create_task(trade_expiry_loop())
+    record_startup_time()
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        matchmaking_task.cancel()
+        static_watcher.cancel()
+        trade_sweeper.cancel()
+        if analytics_exporter is not None:
+            await asyncio.to_thread(analytics_exporter.close)
+        await asyncio.to_thread(profile_store.close)
+
+# 启动耗时：run-server.py 通过环境变量传入启动时刻，就绪后计算从启动到可以处理请求的时间
+LAUNCH_TIME_ENV = "MONOPOLY_LAUNCH_TIME"
+startup_stats = {"launch_to_ready_seconds": None, "boards_prewarmed": 0}
+
+def prewarm_board_templates():
+    """启动时编译所有地图模板和棋盘静态信息，第一局不需要读取和校验地图文件"""
+    for board_name in list_boards():
+        try:
+            get_board_static(load_board_template(board_name))
+            startup_stats["boards_prewarmed"] += 1
+        except ValueError as e:
+            print(f"地图预热失败: {e}")
+
+def record_startup_time():
+    launch_time = os.environ.get(LAUNCH_TIME_ENV)
+    if not launch_time:
+        return
+    try:
+        elapsed = time.time() - float(launch_time)
+    except ValueError:
+        return
+    startup_stats["launch_to_ready_seconds"] = round(elapsed, 3)
+    print(f"服务器就绪，启动耗时 {elapsed * 1000:.0f} ms（预热地图 {startup_stats['boards_prewarmed']} 个）")
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 connections: Dict[str, WebSocket] = {}
 player_ips: Dict[str, str] = {}  # 记录每个玩家的IP地址
-ip_connections: Dict[str, int] = {}  # 记录每个IP的连接数
+connection_index = ConnectionIndex()  # 按 IP、房间、状态索引的连接，每个IP的连接数也从这里读取
 player_colors: Dict[str, str] = {}  # 记录每个玩家选择的颜色
+connection_protocols: Dict[str, str] = {}  # 记录每个连接协商的消息协议（默认 JSON）
 available_colors = ['#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#ffeaa7', '#dda0dd']  # 可选颜色
 game: Game = None
 host_player = None  # 记录房主
 game_started = False  # 记录游戏是否已开始
 MAX_CONNECTIONS_PER_IP = 1  # 每个IP最大连接数
 
+# 心跳检测：由单个全局巡检任务检查最后活跃时间，而不是每个连接各自超时
+last_seen: Dict[str, float] = {}  # 记录每个玩家最后一次收到消息的时间（monotonic）
+HEARTBEAT_TIMEOUT = 120.0  # 超过该秒数无任何消息视为连接失效（客户端每45秒发送一次心跳）
+HEARTBEAT_SWEEP_INTERVAL = 15.0  # 巡检间隔，失效连接最迟在 TIMEOUT + INTERVAL 内被清理
+
+# 广播消息日志：带序号的有界日志，用于断线重连时补发错过的消息
+message_log = deque(maxlen=200)  # 元素为 (序号, 消息)
+message_seq = 0  # 最近一条广播消息的序号
+resuming_players = set()  # 正在补发消息的玩家，补发完成前广播跳过这些连接
+
+# 更新合并：连续的抵押/赎回/出售结果在窗口内合并为一条广播，其他消息发送前先发出已合并的更新
+UPDATE_COALESCE_WINDOW = 0.02  # 合并窗口（秒），设为 0 关闭合并
+COALESCIBLE_TYPES = ("mortgage_result", "redeem_result", "sell_result")
+UNORDERED_TYPES = ("pong",)  # 与游戏状态无关的直接回复（心跳），发送前不必先广播已合并的更新
+pending_update = None  # 等待发送的合并更新
+pending_flush_task = None  # 合并窗口到期后发送更新的任务
+broadcast_stats = {"broadcasts": 0, "coalesced_updates": 0, "started_at": time.monotonic()}
+
+# 对局分析数据：每个操作记录为一行，批量写入 Parquet（无 pyarrow 时为 CSV）
+# 分析模块在第一局开始时才导入，不增加服务器启动时间
+ANALYTICS_DIR = "analytics"
+analytics_exporter = None  # analytics.AnalyticsExporter
+game_recorder = None  # analytics.GameRecorder，每局开始时创建
+
+# 玩家档案、对局历史和排行榜（SQLite，后台线程写入）
+PROFILE_DB_PATH = "monopoly.db"
+profile_store = ProfileStore(PROFILE_DB_PATH)
+
+# 匹配队列：按积分和期望人数自动组局，匹配成功后预留房间给这组玩家
+MATCHMAKING_TICK_INTERVAL = 1.0  # 检查等待超时和房间空闲的间隔（秒）
+MATCH_ACCEPT_TIMEOUT = 30.0  # 预留房间后等待匹配玩家加入的秒数，超时取消预留
+queued_players: Dict[str, WebSocket] = {}  # 排队中的玩家连接
+pending_matches = deque()  # 已匹配、等待空闲房间的对局
+pending_positions: Dict[Match, int] = {}  # 已通知玩家的等待位置，位置变化时才重新通知
+reserved_match: Optional[Match] = None  # 当前房间预留给的对局
+reserved_until = 0.0
+
+# 拍卖：放弃购买的地块限时拍卖，出价立即校验，最高价每个 tick 最多广播一次
+auction_task = None  # 当前拍卖的计时任务
+
+MAX_SPECTATORS = 500  # 最大观战连接数（观战者不占用玩家的IP连接名额）
+
 # 连接历史记录
 connection_history = []
 MAX_HISTORY_SIZE = 100
@@ -46,42 +145,73 @@ def log_connection_event(event_type: str, player_name: str, details: str = "", c
     # 打印到控制台
     print(f"[{timestamp}] {event_type}: {player_name} | {details} | 连接数: {len(connections)}")
 
+@app.get("/api/boards")
+async def get_boards():
+    """获取可选的地图列表"""
+    return {"boards": list_boards(), "default": DEFAULT_BOARD_NAME}
+
 @app.get("/api/board-data")
-async def get_board_data():
-    """获取游戏棋盘数据"""
-    board = Board()
+async def get_board_data(board: str = DEFAULT_BOARD_NAME):
+    """获取游戏棋盘数据（直接读取已编译的地图模板，不创建棋盘）"""
+    try:
+        template = load_board_template(board)
+    except ValueError as e:
+        return {"error": str(e)}
     board_data = []
     
-    for i, tile_name in enumerate(board.game_map):
-        if tile_name == "起点":
-            board_data.append({
-                "name": tile_name,
-                "price": 0,
-                "special": True
-            })
-        elif tile_name in ["机遇", "命运"]:
-            board_data.append({
-                "name": tile_name,
-                "price": 0,
-                "special": False
-            })
-        else:
-            # 从countries字典获取地块信息
-            country_data = board.countries.get(tile_name, {})
-            cost = country_data.get("cost", [0])
-            board_data.append({
-                "name": tile_name,
-                "price": cost[0] if cost else 0,
-                "special": False
-            })
+    for tile in template.tiles:
+        board_data.append({
+            "name": tile.name,
+            "price": tile.cost[0],
+            "special": tile.kind == "start",
+            "group": tile.group,
+            "color": template.groups[tile.group].color if tile.group is not None else None
+        })
     
-    return {"board_data": board_data}
+    return {"board": template.name, "board_data": board_data}
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(limit: int = 10):
+    """积分排行榜"""
+    return {"leaderboard": await profile_store.get_leaderboard(limit)}
+
+@app.get("/api/players/{player_name}")
+async def get_player_profile(player_name: str):
+    """玩家档案：积分、排名、胜率"""
+    profile = await profile_store.get_profile(player_name)
+    if profile is None:
+        return {"error": "玩家不存在"}
+    return profile
+
+@app.get("/api/players/{player_name}/history")
+async def get_player_history(player_name: str, limit: int = 20):
+    """玩家最近的对局记录"""
+    return {"player": player_name, "history": await profile_store.get_history(player_name, limit)}
+
+# 静态页面：启动时读入内存并预压缩（gzip / brotli），请求不访问磁盘
+STATIC_RELOAD_INTERVAL = 2.0  # 检查文件是否变化的间隔（秒），只有变化时才重新加载
+static_assets = StaticAssets({
+    "client.html": "text/html; charset=utf-8",
+    "monitor.html": "text/html; charset=utf-8",
+})
+
+async def static_assets_watcher():
+    """定期检查静态文件的修改时间，变化时在线程中重新读取和压缩"""
+    while True:
+        await asyncio.sleep(STATIC_RELOAD_INTERVAL)
+        try:
+            reloaded = await asyncio.to_thread(static_assets.refresh)
+            if reloaded:
+                print(f"静态文件已重新加载: {reloaded} 个")
+        except Exception as e:
+            print(f"静态文件加载失败 ({type(e).__name__}): {e}")
 
 @app.get("/")
-async def read_root():
+async def read_root(request: Request):
     """提供客户端 HTML 文件"""
-    if os.path.exists("client.html"):
-        return FileResponse("client.html")
+    response = static_assets.response(request, "client.html")
+    if response is not None:
+        return response
     else:
         return HTMLResponse(f"""
         <html>
@@ -99,12 +229,16 @@ async def read_root():
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
-    return {"status": "ok", "message": "大富翁游戏服务器运行正常"}
+    return {"status": "ok", "message": "大富翁游戏服务器运行正常", "startup": startup_stats}
 
 @app.websocket("/ws/{player_name}")
-async def websocket_endpoint(websocket: WebSocket, player_name: str):
+async def websocket_endpoint(websocket: WebSocket, player_name: str, protocol: str = PROTOCOL_JSON, last_seq: Optional[int] = None):
     global host_player, game, game_started
     
+    # 协议协商：通过 ?protocol=packed 选择紧凑协议，未知协议退回 JSON
+    if protocol not in SUPPORTED_PROTOCOLS:
+        protocol = PROTOCOL_JSON
+    
     # 获取客户端IP地址
     client_ip = websocket.client.host
     log_connection_event("连接尝试", player_name, f"来自IP: {client_ip}", client_ip)
@@ -121,8 +255,14 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
         else:
             log_connection_event("玩家重连", player_name, "游戏中玩家重新连接", client_ip)
     
+    # 房间预留给匹配对局时，只允许该对局的玩家加入
+    if not game_started and reserved_match is not None and player_name not in reserved_match.players:
+        log_connection_event("连接拒绝", player_name, "房间已预留给匹配对局", client_ip)
+        await websocket.close(code=4006, reason="房间已预留给匹配对局")
+        return
+    
     # 检查IP连接限制（对重连的现有玩家放宽限制）
-    current_ip_connections = ip_connections.get(client_ip, 0)
+    current_ip_connections = connection_index.ip_count(client_ip)
     is_existing_player_reconnect = game_started and game and any(p.name == player_name for p in game.players)
     
     if current_ip_connections >= MAX_CONNECTIONS_PER_IP and not is_existing_player_reconnect:
@@ -137,86 +277,104 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
         return
     
     await websocket.accept()
+    
+    # 紧凑协议客户端先收到编码表（JSON 文本），之后的消息按编码表解码；在登记连接前发送，广播不会先于编码表到达
+    if protocol == PROTOCOL_PACKED:
+        await websocket.send_json(get_protocol_hello(game))
+        if player_name in connections:
+            await websocket.close(code=4002, reason="玩家名已存在")
+            return
+    
+    # 需要补发时先标记为补发中再登记连接（中间没有 await），广播不会在补发前发给该连接
+    resume = bool(game_started and game and can_replay_since(last_seq))
+    if resume:
+        resuming_players.add(player_name)
     connections[player_name] = websocket
+    last_seen[player_name] = time.monotonic()
     player_ips[player_name] = client_ip
-    ip_connections[client_ip] = current_ip_connections + 1
+    connection_index.add(player_name, client_ip, ROOM_MAIN, STATE_PLAYING if game_started else STATE_LOBBY, websocket)
+    connection_protocols[player_name] = protocol
     
-    log_connection_event("连接成功", player_name, f"IP: {client_ip}, 总连接数: {len(connections)}", client_ip)
+    log_connection_event("连接成功", player_name, f"IP: {client_ip}, 协议: {protocol}, 总连接数: {len(connections)}", client_ip)
     
     # 设置房主（第一个连接的玩家）
     if host_player is None:
         host_player = player_name
         log_connection_event("设置房主", player_name, "", client_ip)
     
-    # 如果是游戏中玩家重连，发送当前游戏状态
-    if game_started and game:
+    # 如果是游戏中玩家重连，优先补发错过的消息，超出日志保留范围时发送当前游戏状态
+    if resume:
+        try:
+            replayed = await replay_missed_messages(player_name, websocket, last_seq, protocol)
+            await send_message(websocket, {
+                "type": "game_resumed",
+                "message": f"欢迎回来，{player_name}！已补发 {replayed} 条消息",
+                "seq": message_seq
+            }, protocol)
+            log_connection_event("消息补发", player_name, f"从序号 {last_seq} 补发 {replayed} 条消息", client_ip)
+        except Exception as e:
+            resuming_players.discard(player_name)
+            log_connection_event("补发失败", player_name, f"补发消息失败: {e}", client_ip)
+    elif game_started and game:
         try:
             game_state = game.get_game_state()
             game_state["type"] = "game_reconnect"
             game_state["message"] = f"欢迎回来，{player_name}！游戏正在进行中"
-            await websocket.send_json(game_state)
+            game_state["seq"] = message_seq
+            await send_message(websocket, game_state, protocol)
             log_connection_event("游戏状态发送", player_name, "已发送当前游戏状态", client_ip)
         except Exception as e:
             log_connection_event("状态发送失败", player_name, f"发送游戏状态失败: {e}", client_ip)
     else:
         # 广播玩家列表更新（仅在游戏未开始时）
         await broadcast_player_list()
+        await start_reserved_match()
     
     try:
         while True:
-            # 设置超时时间，避免无限等待
             try:
-                data = await asyncio.wait_for(websocket.receive_json(), timeout=60.0)
-            except asyncio.TimeoutError:
-                # 60秒内没有收到消息，发送ping检查连接
-                log_connection_event("超时检测", player_name, "60秒无消息，发送ping检查", client_ip)
-                try:
-                    await websocket.send_json({"type": "ping"})
-                    continue
-                except Exception as ping_error:
-                    # 发送失败，连接已断开
-                    log_connection_event("ping失败", player_name, f"ping发送失败: {ping_error}", client_ip)
-                    await handle_player_disconnect(player_name, f"ping发送失败: {ping_error}")
-                    break
+                data = await websocket.receive_json()
             except Exception as receive_error:
                 log_connection_event("接收异常", player_name, f"接收消息异常: {receive_error}", client_ip)
                 await handle_player_disconnect(player_name, f"接收消息异常: {receive_error}")
                 break
-            
+            last_seen[player_name] = time.monotonic()
+
             action = data.get("action")
 
-            # 心跳检测
+            # 应用层心跳：仅刷新活跃时间并应答，不记录日志
             if action == "ping":
-                await websocket.send_json({"type": "pong"})
+                await send_message(websocket, {"type": "pong"}, protocol)
                 continue
 
             if action == "start_game":
                 # 只有房主可以开始游戏
                 if player_name != host_player:
-                    await websocket.send_json({"type": "error", "message": "只有房主可以开始游戏"})
+                    await send_message(websocket, {"type": "error", "message": "只有房主可以开始游戏"}, protocol)
                     continue
                     
                 players = list(connections.keys())
                 if len(players) < 2:
-                    await websocket.send_json({"type": "error", "message": "至少需要2名玩家才能开始游戏"})
+                    await send_message(websocket, {"type": "error", "message": "至少需要2名玩家才能开始游戏"}, protocol)
                     continue
                     
-                game = Game(players=players)
-                game_started = True  # 设置游戏已开始标志
-                
-                # 发送游戏开始消息，包含初始游戏状态
-                initial_state = game.get_game_state()
-                initial_state["type"] = "game_started"
-                await broadcast(initial_state)
+                # 房主可以在开始时选择地图，地图模板已编译缓存，不会重复解析
+                try:
+                    board_template = load_board_template(data.get("board") or DEFAULT_BOARD_NAME)
+                except ValueError as e:
+                    await send_message(websocket, {"type": "error", "message": str(e)}, protocol)
+                    continue
+                    
+                await start_game(players, board_template)
 
             elif action == "roll_dice":
                 if game and game.get_current_player().name == player_name:
                     # 检查是否已经掷过骰子
                     if game.has_rolled_this_turn:
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "error",
                             "message": "本回合已经掷过骰子，请完成当前操作或结束回合"
-                        })
+                        }, protocol)
                         continue
                     
                     d1, d2 = game.roll_dice()
@@ -224,25 +382,30 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                     
                     # 检查是否有错误
                     if "error" in result:
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "error",
                             "message": result["error"]
-                        })
+                        }, protocol)
                         continue
                     
                     result["type"] = "turn_result"
+                    record_analytics("roll", player_name, result)
+                    if result.get("game_over"):
+                        record_game_result()
                     result["dice_values"] = [d1, d2]  # 添加单独的骰子值
                     await broadcast(result)
                 else:
-                    await websocket.send_json({
+                    await send_message(websocket, {
                         "type": "error",
                         "message": "不是您的回合"
-                    })
+                    }, protocol)
 
             elif action == "buy_property":
                 if game and game.get_current_player().name == player_name:
+                    tile_name = game.board.tiles[game.get_current_player().position].name
                     result = game.buy_property()
                     result["type"] = "buy_result"
+                    record_analytics("buy", player_name, result, tile_name, "acquire")
                     # 添加当前玩家信息，因为购买后会切换到下一位玩家
                     result["current_player"] = game.get_current_player().name
                     result["has_rolled_this_turn"] = game.has_rolled_this_turn
@@ -250,8 +413,10 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
 
             elif action == "upgrade_property":
                 if game and game.get_current_player().name == player_name:
+                    tile_name = game.board.tiles[game.get_current_player().position].name
                     result = game.upgrade_property()
                     result["type"] = "upgrade_result"
+                    record_analytics("upgrade", player_name, result, tile_name, "upgrade")
                     # 添加当前玩家信息，因为升级后会切换到下一位玩家
                     result["current_player"] = game.get_current_player().name
                     result["has_rolled_this_turn"] = game.has_rolled_this_turn
@@ -263,7 +428,8 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                     if property_name:
                         result = game.mortgage_property(property_name)
                         result["type"] = "mortgage_result"
-                        await broadcast(result)
+                        record_analytics("mortgage", player_name, result, property_name, "mortgage")
+                        await broadcast_coalesced(result)
 
             elif action == "redeem_property":
                 if game and game.get_current_player().name == player_name:
@@ -271,7 +437,8 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                     if property_name:
                         result = game.redeem_property(property_name)
                         result["type"] = "redeem_result"
-                        await broadcast(result)
+                        record_analytics("redeem", player_name, result, property_name, "redeem")
+                        await broadcast_coalesced(result)
 
             elif action == "sell_property":
                 if game and game.get_current_player().name == player_name:
@@ -279,19 +446,45 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                     if property_name:
                         result = game.sell_property(property_name)
                         result["type"] = "sell_result"
-                        await broadcast(result)
+                        record_analytics("sell", player_name, result, property_name, "release")
+                        await broadcast_coalesced(result)
 
             elif action == "get_financial_options":
                 if game:
                     result = game.get_financial_options(player_name)
                     result["type"] = "financial_options"
-                    await websocket.send_json(result)
+                    await send_message(websocket, result, protocol)
+
+            elif action == "get_advice":
+                # 只读评估：为当前玩家的所有候选行动计算未来 K 回合的期望现金流
+                if game:
+                    horizon = data.get("horizon")
+                    if not isinstance(horizon, int):
+                        horizon = None
+                    from advisor import get_advice  # 按需导入，不使用时不增加启动时间
+                    result = get_advice(game, player_name, horizon)
+                    result["type"] = "advice"
+                    await send_message(websocket, result, protocol)
 
             elif action == "end_turn":
                 if game:
                     # 检查是否是当前玩家
                     current_player = game.get_current_player()
                     if current_player.name == player_name:
+                        if game.auction is not None:
+                            await send_message(websocket, {
+                                "type": "error",
+                                "message": "拍卖进行中，结束后自动进入下一回合"
+                            }, protocol)
+                            continue
+                        if game.pending_action and game.pending_action.get("action") == "prompt_buy":
+                            # 放弃购买：地块进入拍卖，拍卖结算后才切换到下一位玩家
+                            result = game.start_auction(time.monotonic())
+                            result["type"] = "auction_started"
+                            record_analytics("decline", player_name, result, result["auction"]["property"])
+                            await broadcast(result)
+                            start_auction_timer()
+                            continue
                         game.next_player()  # next_player 方法已经包含重置掷骰子状态
                         new_current_player = game.get_current_player()
                         result = {
@@ -309,12 +502,68 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                             result["game_over"] = True
                             result["winner"] = game.get_winner().name
                         
+                        record_analytics("end_turn", player_name, result)
+                        if result.get("game_over"):
+                            record_game_result()
                         await broadcast(result)
                     else:
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "error",
                             "message": "不是您的回合，无法结束回合"
-                        })
+                        }, protocol)
+
+            elif action == "place_bid":
+                # 拍卖出价：立即校验并写入出价簿，不单独广播
+                if game:
+                    amount = data.get("amount")
+                    error = game.place_bid(player_name, amount, time.monotonic())
+                    if error:
+                        await send_message(websocket, {"type": "error", "message": error}, protocol)
+                    else:
+                        await send_message(websocket, {"type": "bid_accepted", "amount": amount}, protocol)
+
+            elif action == "propose_trade":
+                # 交易报价只发给双方，不广播
+                if game:
+                    receiver = data.get("to")
+                    result = game.propose_trade(
+                        player_name, receiver,
+                        data.get("give_cash", 0), data.get("give_properties", []),
+                        data.get("get_cash", 0), data.get("get_properties", []),
+                        time.monotonic()
+                    )
+                    if "error" in result:
+                        await send_message(websocket, {"type": "error", "message": result["error"]}, protocol)
+                    else:
+                        await send_to_players((player_name, receiver), {"type": "trade_offer", **result})
+
+            elif action == "accept_trade":
+                # 接受报价：所有现金和地块一次性交换，只广播一条结果
+                if game:
+                    result = game.accept_trade(player_name, data.get("offer_id"), time.monotonic())
+                    if "error" in result:
+                        await send_message(websocket, {"type": "error", "message": result["error"]}, protocol)
+                    else:
+                        result["type"] = "trade_result"
+                        record_analytics("trade", player_name, result)
+                        await broadcast(result)
+
+            elif action in ("reject_trade", "cancel_trade"):
+                if game:
+                    result = game.close_trade(player_name, data.get("offer_id"))
+                    if "error" in result:
+                        await send_message(websocket, {"type": "error", "message": result["error"]}, protocol)
+                    else:
+                        offer = result["offer"]
+                        await send_to_players((offer["from"], offer["to"]), {"type": "trade_closed", **result})
+
+            elif action == "list_trades":
+                if game:
+                    now = time.monotonic()
+                    await send_message(websocket, {
+                        "type": "trade_list",
+                        "offers": [offer.to_dict(now) for offer in game.trades.for_player(player_name)]
+                    }, protocol)
 
             elif action == "choose_color":
                 # 处理玩家选择颜色
@@ -323,23 +572,23 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
                     # 检查颜色是否已被占用
                     if selected_color not in player_colors.values():
                         player_colors[player_name] = selected_color
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "color_selected", 
                             "color": selected_color,
                             "message": f"成功选择颜色"
-                        })
+                        }, protocol)
                         # 广播玩家列表更新
                         await broadcast_player_list()
                     else:
-                        await websocket.send_json({
+                        await send_message(websocket, {
                             "type": "error", 
                             "message": "该颜色已被其他玩家选择"
-                        })
+                        }, protocol)
                 else:
-                    await websocket.send_json({
+                    await send_message(websocket, {
                         "type": "error", 
                         "message": "无效的颜色选择"
-                    })
+                    }, protocol)
 
             elif action == "leave_room":
                 # 主动退出房间
@@ -361,6 +610,70 @@ async def websocket_endpoint(websocket: WebSocket, player_name: str):
         log_connection_event("未知异常", player_name, disconnect_reason, client_ip)
         await handle_player_disconnect(player_name, disconnect_reason)
 
+async def start_game(players, board_template):
+    """按玩家顺序创建新游戏并广播初始状态"""
+    global game, game_started, game_recorder, reserved_match, analytics_exporter
+    from analytics import AnalyticsExporter, GameRecorder
+    
+    game = Game(players=players, board_template=board_template)
+    game_started = True  # 设置游戏已开始标志
+    reserved_match = None
+    connection_index.set_room_state(ROOM_MAIN, STATE_PLAYING)
+    if analytics_exporter is None:
+        analytics_exporter = AnalyticsExporter(ANALYTICS_DIR)
+    game_recorder = GameRecorder(analytics_exporter, game)
+    
+    # 发送游戏开始消息，包含初始游戏状态
+    initial_state = game.get_game_state()
+    initial_state["type"] = "game_started"
+    await broadcast(initial_state)
+
+async def send_to_players(player_names, message: dict):
+    """只发给指定玩家（例如交易双方），发送失败由连接自身的接收循环清理"""
+    for name in dict.fromkeys(player_names):
+        ws = connections.get(name)
+        if ws is None:
+            continue
+        try:
+            await send_message(ws, message, connection_protocols.get(name, PROTOCOL_JSON))
+        except Exception as e:
+            print(f"向玩家 {name} 发送消息失败 ({type(e).__name__}): {e}")
+
+async def trade_expiry_loop():
+    """定期清理过期的交易报价并通知双方；没有过期报价时只检查一次堆顶"""
+    while True:
+        await asyncio.sleep(TRADE_SWEEP_INTERVAL)
+        if game is None:
+            continue
+        for offer in game.expire_trades(time.monotonic()):
+            await send_to_players((offer["from"], offer["to"]), {"type": "trade_closed", "offer": offer, "reason": "expired"})
+
+def start_auction_timer():
+    global auction_task
+    auction_task = asyncio.create_task(run_auction(game.auction))
+
+async def run_auction(auction):
+    """拍卖计时：每个 tick 最高价有变化时广播一次，时间到后结算并广播结果"""
+    while game is not None and game.auction is auction:
+        await asyncio.sleep(AUCTION_TICK_INTERVAL)
+        if game is None or game.auction is not auction:
+            return
+        now = time.monotonic()
+        if auction.is_over(now):
+            result = game.finish_auction()
+            result["type"] = "auction_result"
+            sale = result.get("winner_bid")
+            if sale:
+                record_analytics("auction", sale["player"], result, auction.property_name, "acquire")
+            if result.get("game_over"):
+                record_game_result()
+            await broadcast(result)
+            return
+        update = auction.take_update(now)
+        if update is not None:
+            update["type"] = "auction_update"
+            await broadcast(update)
+
 async def handle_player_disconnect(player_name: str, reason: str = "未知原因"):
     """处理玩家断开连接的清理工作"""
     global host_player, game, game_started
@@ -373,6 +686,9 @@ async def handle_player_disconnect(player_name: str, reason: str = "未知原因
     before_count = len(connections)
     
     # 清理连接记录
+    last_seen.pop(player_name, None)
+    resuming_players.discard(player_name)
+    connection_protocols.pop(player_name, None)
     if player_name in connections:
         del connections[player_name]
         log_connection_event("清理连接", player_name, "移除连接记录", client_ip)
@@ -390,13 +706,12 @@ async def handle_player_disconnect(player_name: str, reason: str = "未知原因
         del player_ips[player_name]
         
         # 减少IP连接计数
-        if client_ip in ip_connections:
-            ip_connections[client_ip] -= 1
-            if ip_connections[client_ip] <= 0:
-                del ip_connections[client_ip]
+        if connection_index.remove(player_name) is not None:
+            remaining = connection_index.ip_count(client_ip)
+            if remaining <= 0:
                 log_connection_event("清理IP", player_name, f"清除IP连接记录: {client_ip}", client_ip)
             else:
-                log_connection_event("IP更新", player_name, f"IP {client_ip} 剩余连接数: {ip_connections[client_ip]}", client_ip)
+                log_connection_event("IP更新", player_name, f"IP {client_ip} 剩余连接数: {remaining}", client_ip)
     
     # 如果离开的是房主，将房主转移给下一个玩家
     if player_name == host_player:
@@ -409,6 +724,7 @@ async def handle_player_disconnect(player_name: str, reason: str = "未知原因
             game = None  # 如果没有玩家了，重置游戏状态
             game_started = False  # 重置游戏开始标志
             player_colors.clear()  # 清空所有颜色记录
+            message_log.clear()  # 清空消息日志，序号保持递增
             log_connection_event("重置游戏", player_name, "所有玩家离开，重置游戏状态", client_ip)
     
     # 如果游戏进行中且玩家离开，可能需要暂停游戏或做其他处理
@@ -443,17 +759,111 @@ async def handle_player_disconnect(player_name: str, reason: str = "未知原因
     final_stats = f"连接数变化: {before_count}→{after_count}, 在线: {list(connections.keys())}, 房主: {host_player}"
     log_connection_event("断开完成", player_name, final_stats, client_ip)
 
+async def send_payload(websocket: WebSocket, payload):
+    """发送已编码的消息，二进制负载使用二进制帧"""
+    if isinstance(payload, bytes):
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+async def send_message(websocket: WebSocket, message: dict, protocol: str = PROTOCOL_JSON):
+    """按连接协商的协议发送单条消息；依赖游戏状态的消息发送前先广播已合并的更新，保证顺序"""
+    if pending_update is not None and message.get("type") not in UNORDERED_TYPES:
+        await flush_pending_update()
+    await send_payload(websocket, encode_message(message, game, protocol))
+
+async def broadcast_coalesced(message: dict):
+    """在合并窗口内合并连续的财务操作结果，窗口到期或有其他消息时一次性广播"""
+    global pending_update, pending_flush_task
+    
+    if UPDATE_COALESCE_WINDOW <= 0 or message.get("type") not in COALESCIBLE_TYPES or "error" in message:
+        await broadcast(message)
+        return
+    
+    if pending_update is None:
+        pending_update = message
+        pending_flush_task = asyncio.create_task(flush_after_window())
+        return
+    
+    # 合并：事件按顺序追加，玩家状态取最新
+    pending_update["type"] = message["type"]
+    pending_update["player"] = message["player"]
+    pending_update["events"] = pending_update["events"] + message["events"]
+    pending_update["players"] = message["players"]
+    broadcast_stats["coalesced_updates"] += 1
+
+async def flush_after_window():
+    await asyncio.sleep(UPDATE_COALESCE_WINDOW)
+    await flush_pending_update()
+
+async def flush_pending_update():
+    """立即广播已合并的更新"""
+    global pending_update, pending_flush_task
+    
+    message, pending_update = pending_update, None
+    task, pending_flush_task = pending_flush_task, None
+    if task is not None and task is not asyncio.current_task():
+        task.cancel()
+    if message is not None:
+        await broadcast(message)
+
+def can_replay_since(last_seq: Optional[int]) -> bool:
+    """检查从 last_seq 之后的消息是否仍全部保留在日志中"""
+    if last_seq is None or last_seq > message_seq:
+        return False
+    if last_seq == message_seq:
+        return True
+    return bool(message_log) and message_log[0][0] <= last_seq + 1
+
+async def replay_missed_messages(player_name: str, websocket: WebSocket, last_seq: int, protocol: str) -> int:
+    """按序补发 last_seq 之后的广播消息，返回补发条数
+
+    补发期间广播跳过该连接，新消息进入日志后由本循环继续补发，直到追上最新序号。
+    """
+    resuming_players.add(player_name)
+    sent_seq = last_seq
+    replayed = 0
+    while True:
+        missed = [(seq, message) for seq, message in message_log if seq > sent_seq]
+        if not missed:
+            break
+        for seq, message in missed:
+            await send_message(websocket, message, protocol)
+            sent_seq = seq
+            replayed += 1
+    resuming_players.discard(player_name)
+    return replayed
+
 async def broadcast(message: dict):
     """广播消息到所有连接的客户端，自动清理失效连接"""
+    global message_seq
+    
+    # 保证顺序：先发出窗口内已合并的更新
+    if pending_update is not None:
+        await flush_pending_update()
+    
+    # 记录到消息日志，供断线重连的玩家补发
+    broadcast_stats["broadcasts"] += 1
+    message_seq += 1
+    message["seq"] = message_seq
+    message_log.append((message_seq, message))
+    spectator_hub.publish(message_seq)
+    
     if not connections:
         return
     
     failed_connections = []
     success_count = 0
+    payloads = {}  # 每种协议只编码一次
     
     for player_name, ws in connections.items():
+        if player_name in resuming_players:
+            continue
         try:
-            await ws.send_json(message)
+            protocol = connection_protocols.get(player_name, PROTOCOL_JSON)
+            if protocol not in payloads:
+                payloads[protocol] = encode_message(message, game, protocol)
+            await send_payload(ws, payloads[protocol])
             success_count += 1
         except Exception as e:
             error_type = type(e).__name__
@@ -467,15 +877,35 @@ async def broadcast(message: dict):
         print(f"清理失效连接: {player_name}, 原因: {failure_reason}")
         # 注意：这里不能直接调用handle_player_disconnect，会导致递归
         # 直接清理连接记录
+        last_seen.pop(player_name, None)
+        connection_protocols.pop(player_name, None)
         if player_name in connections:
             del connections[player_name]
-        if player_name in player_ips:
-            client_ip = player_ips[player_name]
-            del player_ips[player_name]
-            if client_ip in ip_connections:
-                ip_connections[client_ip] -= 1
-                if ip_connections[client_ip] <= 0:
-                    del ip_connections[client_ip]
+        player_ips.pop(player_name, None)
+        connection_index.remove(player_name)
+
+async def heartbeat_sweeper():
+    """全局心跳巡检：定期检查所有连接的最后活跃时间，关闭失效连接
+
+    空闲连接不会产生任何定时唤醒或日志，关闭后由连接自身的接收循环完成清理。
+    """
+    while True:
+        await asyncio.sleep(HEARTBEAT_SWEEP_INTERVAL)
+        deadline = time.monotonic() - HEARTBEAT_TIMEOUT
+        stale_players = [name for name, seen in last_seen.items() if seen < deadline]
+        stale_sockets = []
+        for player_name in stale_players:
+            last_seen.pop(player_name, None)
+            ws = connections.get(player_name)
+            if ws is None:
+                continue
+            log_connection_event("心跳超时", player_name, f"{HEARTBEAT_TIMEOUT:.0f}秒无消息，关闭连接", player_ips.get(player_name, ""))
+            stale_sockets.append(ws)
+        if stale_sockets:
+            # 并发关闭，每个连接限时，个别不响应关闭握手的连接不会拖住整轮巡检
+            result = await close_connections(stale_sockets, 1001, "心跳超时")
+            if result["timed_out"] or result["failed"]:
+                log_connection_event("关闭失败", "心跳巡检", f"关闭失效连接: {result}")
 
 async def broadcast_player_list():
     """广播当前玩家列表，包含颜色信息"""
@@ -489,6 +919,203 @@ async def broadcast_player_list():
         }
         await broadcast(message)
 
+def record_analytics(action: str, player_name: str, result: dict, property_name: str = "", ownership_change: str = ""):
+    """记录对局分析数据（只写内存缓冲区，不阻塞游戏循环）"""
+    if game_recorder is not None and game_recorder.game is game:
+        game_recorder.record(action, player_name, result, property_name, ownership_change)
+
+def record_game_result():
+    """游戏结束时提交对局结果，档案和积分由后台线程写入数据库"""
+    if game and game_recorder is not None and game_recorder.game is game:
+        profile_store.submit_result(build_match_result(game, game_recorder.game_id))
+
+def get_spectator_snapshot() -> dict:
+    """观战者的完整状态快照：游戏中为游戏状态，未开始时为房间玩家列表"""
+    if game_started and game:
+        snapshot = game.get_game_state()
+    else:
+        snapshot = {
+            "players": list(connections.keys()),
+            "host": host_player,
+            "player_colors": dict(player_colors),
+            "available_colors": [color for color in available_colors if color not in player_colors.values()]
+        }
+    snapshot["type"] = "spectator_snapshot"
+    snapshot["game_started"] = bool(game_started and game)
+    snapshot["seq"] = message_seq
+    return snapshot
+
+spectator_hub = SpectatorHub(message_log, get_spectator_snapshot, lambda message, protocol: encode_message(message, game, protocol))
+
+@app.websocket("/spectate")
+async def spectator_endpoint(websocket: WebSocket, protocol: str = PROTOCOL_JSON):
+    """观战端点：只读接收房间广播，由独立的扇出层发送，不影响玩家广播"""
+    if protocol not in SUPPORTED_PROTOCOLS:
+        protocol = PROTOCOL_JSON
+    client_ip = websocket.client.host
+    
+    if len(spectator_hub) >= MAX_SPECTATORS:
+        log_connection_event("观战拒绝", "观战者", f"观战人数已满: {MAX_SPECTATORS}", client_ip)
+        await websocket.close(code=4005, reason="观战人数已满")
+        return
+    
+    await websocket.accept()
+    log_connection_event("观战加入", "观战者", f"IP: {client_ip}, 观战人数: {len(spectator_hub) + 1}", client_ip)
+    
+    if protocol == PROTOCOL_PACKED:
+        await websocket.send_json(get_protocol_hello(game))
+    
+    sender = asyncio.create_task(spectator_hub.serve(websocket, protocol))
+    try:
+        # 观战者发送的消息一律忽略，只用于检测断开
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except Exception as e:
+        log_connection_event("观战异常", "观战者", f"接收异常: {e}", client_ip)
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        log_connection_event("观战离开", "观战者", f"IP: {client_ip}, 观战人数: {len(spectator_hub)}", client_ip)
+
+@app.websocket("/matchmaking/{player_name}")
+async def matchmaking_endpoint(websocket: WebSocket, player_name: str, players: int = 4):
+    """匹配队列：按积分和期望人数（2-6）排队，匹配成功后收到 match_found 再连接 /ws/{player_name}"""
+    client_ip = websocket.client.host
+    if player_name in connections or player_name in queued_players:
+        await websocket.close(code=4002, reason="玩家名已存在")
+        return
+    
+    await websocket.accept()
+    profile = await profile_store.get_profile(player_name)
+    rating = profile["rating"] if profile else DEFAULT_RATING
+    queued_players[player_name] = websocket
+    connection_index.add(player_name, client_ip, ROOM_MATCHMAKING, STATE_QUEUED, websocket)
+    try:
+        try:
+            matchmaker.enqueue(player_name, rating, players)
+        except ValueError as e:
+            await websocket.send_json({"type": "error", "message": str(e)})
+            return
+        log_connection_event("加入匹配", player_name, f"积分: {rating}, 人数: {players}, 排队: {len(matchmaker)}", client_ip)
+        if player_name in matchmaker:
+            await websocket.send_json({
+                "type": "queue_joined",
+                "rating": rating,
+                "players": players,
+                "queue_size": len(matchmaker)
+            })
+        await dispatch_matches()
+        
+        while True:
+            data = await websocket.receive_json()
+            if data.get("action") == "ping":
+                await websocket.send_json({"type": "pong"})
+            elif data.get("action") == "cancel":
+                break
+    except Exception:
+        # 排队连接断开即视为取消
+        pass
+    finally:
+        if queued_players.get(player_name) is websocket:
+            del queued_players[player_name]
+            connection_index.remove(player_name, ROOM_MATCHMAKING)
+        if matchmaker.cancel(player_name):
+            log_connection_event("退出匹配", player_name, f"排队: {len(matchmaker)}", client_ip)
+
+def queue_match(match: Match):
+    """匹配成功：排队等待空闲房间"""
+    pending_matches.append(match)
+
+async def notify_queued(player_names, message: dict):
+    """向排队连接发送消息，忽略已断开的连接"""
+    for name in player_names:
+        websocket = queued_players.get(name)
+        if websocket is not None:
+            try:
+                await websocket.send_json(message)
+            except Exception:
+                pass
+
+queue_close_tasks: Set[asyncio.Task] = set()  # 进行中的排队超时通知，保留引用以免任务被垃圾回收
+
+def notify_queue_expired(ticket: QueueTicket):
+    """排队超时：通知玩家并结束排队连接"""
+    websocket = queued_players.get(ticket.name)
+    if websocket is not None:
+        task = asyncio.create_task(close_queue_connection(websocket, "匹配超时，请重新排队"))
+        queue_close_tasks.add(task)
+        task.add_done_callback(queue_close_tasks.discard)
+
+async def close_queue_connection(websocket: WebSocket, message: str):
+    try:
+        await websocket.send_json({"type": "queue_expired", "message": message})
+        await websocket.close(code=1000, reason="匹配超时")
+    except Exception:
+        pass
+
+matchmaker = MatchmakingQueue(queue_match, notify_queue_expired)
+
+async def dispatch_matches():
+    """房间空闲时把下一组匹配玩家交给房间：预留房间并通知玩家加入"""
+    global reserved_match, reserved_until
+    if reserved_match is not None and time.monotonic() > reserved_until and not game_started:
+        log_connection_event("取消预留", "匹配", f"玩家未在 {MATCH_ACCEPT_TIMEOUT:.0f} 秒内全部加入: {list(reserved_match.players)}")
+        reserved_match = None
+    if reserved_match is None and not game_started and not connections and pending_matches:
+        reserved_match = pending_matches.popleft()
+        pending_positions.pop(reserved_match, None)
+        reserved_until = time.monotonic() + MATCH_ACCEPT_TIMEOUT
+        log_connection_event("匹配成功", "匹配", f"玩家: {list(reserved_match.players)}, 平均积分: {reserved_match.average_rating}")
+        await notify_queued(reserved_match.players, {
+            "type": "match_found",
+            "players": list(reserved_match.players),
+            "average_rating": reserved_match.average_rating,
+            "accept_timeout": MATCH_ACCEPT_TIMEOUT
+        })
+    
+    # 仍在等待房间的对局，位置变化时通知玩家
+    for position, match in enumerate(pending_matches, start=1):
+        if pending_positions.get(match) != position:
+            pending_positions[match] = position
+            await notify_queued(match.players, {
+                "type": "queue_status",
+                "status": "matched",
+                "players": list(match.players),
+                "position": position
+            })
+
+async def start_reserved_match():
+    """预留房间的匹配玩家全部加入后自动开始游戏"""
+    if reserved_match is None or game_started:
+        return
+    if all(name in connections for name in reserved_match.players):
+        players = list(reserved_match.players)
+        log_connection_event("自动开局", "匹配", f"玩家: {players}")
+        await start_game(players, load_board_template(DEFAULT_BOARD_NAME))
+
+async def matchmaking_loop():
+    """定期检查排队超时、扩大积分范围，并在房间空闲时分配下一组匹配玩家"""
+    while True:
+        await asyncio.sleep(MATCHMAKING_TICK_INTERVAL)
+        matchmaker.tick()
+        await dispatch_matches()
+
+def get_broadcast_stats() -> dict:
+    """广播统计：合并窗口节省的消息数和每秒广播数"""
+    uptime = max(time.monotonic() - broadcast_stats["started_at"], 1e-9)
+    broadcasts = broadcast_stats["broadcasts"]
+    coalesced = broadcast_stats["coalesced_updates"]
+    return {
+        "coalesce_window_ms": UPDATE_COALESCE_WINDOW * 1000,
+        "broadcasts": broadcasts,
+        "coalesced_updates": coalesced,
+        "broadcasts_per_second": round(broadcasts / uptime, 3),
+        "saved_per_second": round(coalesced / uptime, 3),
+        "reduction_ratio": round(coalesced / (broadcasts + coalesced), 3) if broadcasts + coalesced else 0.0
+    }
+
 @app.get("/admin/status")
 async def admin_status():
     """管理员查看当前连接状态"""
@@ -496,39 +1123,144 @@ async def admin_status():
         "total_connections": len(connections),
         "players": list(connections.keys()),
         "host_player": host_player,
-        "ip_connections": dict(ip_connections),
+        "ip_connections": connection_index.ip_counts(),
         "player_ips": dict(player_ips),
-        "game_started": game_started
+        "game_started": game_started,
+        "spectators": len(spectator_hub),
+        "broadcast_stats": get_broadcast_stats(),
+        "matchmaking": dict(matchmaker.stats(), pending_matches=len(pending_matches),
+                            reserved_match=list(reserved_match.players) if reserved_match else None)
     }
     return status
 
+ADMIN_CLOSE_TIMEOUT = 2.0  # 批量操作中关闭单个连接的最长等待（秒），整批操作在该时间内完成
+ADMIN_PAGE_LIMIT = 200  # 分页查询每页最多条数
+
+async def close_connections(websockets, code: int, reason: str) -> dict:
+    """并发关闭连接，每个连接最多等待 ADMIN_CLOSE_TIMEOUT 秒"""
+    started = time.monotonic()
+    
+    async def close_one(ws: WebSocket):
+        await asyncio.wait_for(ws.close(code=code, reason=reason), ADMIN_CLOSE_TIMEOUT)
+    
+    results = await asyncio.gather(*(close_one(ws) for ws in websockets), return_exceptions=True)
+    return {
+        "closed": sum(1 for r in results if r is None),
+        "timed_out": sum(1 for r in results if isinstance(r, asyncio.TimeoutError)),
+        "failed": sum(1 for r in results if isinstance(r, Exception) and not isinstance(r, asyncio.TimeoutError)),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+
+def get_room_summary(room: str, counts: dict) -> dict:
+    summary = {"room": room, **counts}
+    if room == ROOM_MAIN:
+        if game_started:
+            summary["state"] = "playing"
+        elif reserved_match is not None:
+            summary["state"] = "reserved"
+        else:
+            summary["state"] = "waiting"
+        summary["host"] = host_player
+        summary["spectators"] = len(spectator_hub)
+    elif room == ROOM_MATCHMAKING:
+        summary["state"] = "queueing"
+        summary["pending_matches"] = len(pending_matches)
+    return summary
+
+@app.get("/admin/rooms")
+async def admin_rooms(state: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50):
+    """房间列表：按房间名分页，可按房间状态筛选"""
+    limit = max(1, min(limit, ADMIN_PAGE_LIMIT))
+    counts = connection_index.room_counts()
+    counts.setdefault(ROOM_MAIN, {"connections": 0, "states": {}})
+    rooms = [get_room_summary(room, counts[room]) for room in sorted(counts) if not cursor or room > cursor]
+    if state:
+        rooms = [room for room in rooms if room["state"] == state]
+    page = rooms[:limit]
+    return {"rooms": page, "next_cursor": page[-1]["room"] if len(rooms) > limit else None}
+
+@app.get("/admin/players")
+async def admin_players(ip: Optional[str] = None, room: Optional[str] = None, state: Optional[str] = None,
+                        cursor: Optional[str] = None, limit: int = 50):
+    """连接列表：按 IP、房间、状态筛选（服务器端索引），按名称游标分页"""
+    limit = max(1, min(limit, ADMIN_PAGE_LIMIT))
+    entries, next_cursor = connection_index.query(ip=ip, room=room, state=state, cursor=cursor, limit=limit)
+    now = time.monotonic()
+    players = []
+    for entry in entries:
+        item = entry.to_dict()
+        seen = last_seen.get(entry.name) if entry.room == ROOM_MAIN else None
+        item["idle_seconds"] = round(now - seen, 1) if seen is not None else None
+        players.append(item)
+    return {"players": players, "next_cursor": next_cursor, "total": len(connection_index)}
+
+@app.post("/admin/bulk/{action}")
+async def admin_bulk(action: str, ip: Optional[str] = None, room: Optional[str] = None,
+                     state: Optional[str] = None, players: Optional[str] = None):
+    """批量踢出（kick）或关闭（close）连接：按筛选条件或逗号分隔的玩家名，并发执行，限时完成"""
+    if action not in ("kick", "close"):
+        return {"error": "未知的批量操作，支持 kick / close"}
+    if players:
+        names = {name for name in players.split(",") if name}
+        targets = [entry for entry in (connection_index.get(name, room or ROOM_MAIN) for name in names) if entry]
+    elif ip or room or state:
+        targets, cursor = [], None
+        while True:
+            page, cursor = connection_index.query(ip=ip, room=room, state=state, cursor=cursor, limit=ADMIN_PAGE_LIMIT)
+            targets.extend(page)
+            if cursor is None:
+                break
+    else:
+        return {"error": "请指定筛选条件（ip / room / state）或玩家名（players）"}
+    
+    code, reason = (4003, "被管理员踢出") if action == "kick" else (1001, "服务器关闭连接")
+    result = await close_connections([entry.websocket for entry in targets if entry.websocket is not None], code, reason)
+    log_connection_event("批量操作", "管理员", f"{action}: {len(targets)} 个连接, {result}")
+    return {"action": action, "targets": [entry.name for entry in targets], **result}
+
 @app.post("/admin/kick/{player_name}")
 async def admin_kick_player(player_name: str):
     """管理员踢出指定玩家"""
     if player_name in connections:
-        ws = connections[player_name]
-        await ws.close(code=4003, reason="被管理员踢出")
-        return {"message": f"玩家 {player_name} 已被踢出"}
+        result = await close_connections([connections[player_name]], 4003, "被管理员踢出")
+        if result["closed"]:
+            return {"message": f"玩家 {player_name} 已被踢出"}
+        return {"error": f"关闭连接失败或超时: {result}"}
     return {"error": "玩家不存在"}
 
 @app.post("/admin/reset")
 async def admin_reset():
     """管理员重置游戏状态"""
-    global game, host_player, game_started
+    global game, host_player, game_started, pending_update, pending_flush_task, reserved_match, auction_task
+    
+    # 停止进行中的拍卖
+    if auction_task is not None:
+        auction_task.cancel()
+        auction_task = None
+    
+    # 丢弃未发送的合并更新
+    if pending_flush_task is not None:
+        pending_flush_task.cancel()
+    pending_update = None
+    pending_flush_task = None
     
-    # 关闭所有连接
-    for ws in connections.values():
-        await ws.close(code=4004, reason="管理员重置游戏")
+    # 并发关闭所有连接，限时完成
+    result = await close_connections(list(connections.values()), 4004, "管理员重置游戏")
     
     # 清空所有状态
     connections.clear()
+    last_seen.clear()
+    connection_protocols.clear()
+    message_log.clear()
+    resuming_players.clear()
     player_ips.clear()
-    ip_connections.clear()
+    connection_index.clear_room(ROOM_MAIN)
     game = None
     host_player = None
     game_started = False
+    reserved_match = None
     
-    return {"message": "游戏状态已重置"}
+    return {"message": "游戏状态已重置", **result}
 
 @app.get("/admin/connections")
 async def admin_connections():
@@ -538,7 +1270,7 @@ async def admin_connections():
             "total": len(connections),
             "players": list(connections.keys()),
             "host_player": host_player,
-            "ip_connections": dict(ip_connections),
+            "ip_connections": connection_index.ip_counts(),
             "player_ips": dict(player_ips),
             "game_started": game_started
         },
@@ -547,7 +1279,7 @@ async def admin_connections():
             "total_events": len(connection_history),
             "recent_disconnects": len([h for h in connection_history[-20:] if "断开" in h["type"]]),
             "recent_connects": len([h for h in connection_history[-20:] if "连接成功" in h["type"]]),
-            "active_ips": list(set(player_ips.values()))
+            "active_ips": connection_index.ips()
         }
     }
 
@@ -559,14 +1291,16 @@ async def admin_connections_live():
         "total_connections": len(connections),
         "players": list(connections.keys()),
         "host": host_player,
-        "ip_count": len(ip_connections),
-        "game_active": game_started
+        "ip_count": len(connection_index.ip_counts()),
+        "game_active": game_started,
+        "spectators": len(spectator_hub)
     }
 
 @app.get("/monitor")
-async def monitor_page():
+async def monitor_page(request: Request):
     """提供连接监控页面"""
-    if os.path.exists("monitor.html"):
-        return FileResponse("monitor.html")
+    response = static_assets.response(request, "monitor.html")
+    if response is not None:
+        return response
     else:
         return HTMLResponse("<h1>监控页面文件不存在</h1><p>请确保 monitor.html 文件存在。</p>")
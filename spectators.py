@@ -0,0 +1,112 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Deque, Dict, Set, Tuple, Union
+
+from fastapi import WebSocket
+
+Payload = Union[str, bytes]
+
+SPECTATOR_MAX_LAG = 8  # 观战者落后超过该条数时直接发送最新状态，跳过中间消息
+PAYLOAD_CACHE_SIZE = 256  # 已编码消息缓存条数（按 序号+协议 缓存，所有观战者共享）
+
+
+class Spectator:
+    """单个观战连接：记录协议和已发送到的消息序号"""
+
+    def __init__(self, websocket: WebSocket, protocol: str):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.cursor = 0
+
+
+class SpectatorHub:
+    """观战者扇出层
+
+    玩家广播只调用 publish() 记录最新序号并唤醒发送任务，不等待任何观战连接；
+    每个观战者由独立任务从共享消息日志中按序发送，落后过多时合并为一份最新状态快照。
+    每条消息和快照对每种协议只编码一次。
+    """
+
+    def __init__(
+        self,
+        message_log: Deque[Tuple[int, Dict[str, Any]]],
+        snapshot_factory: Callable[[], Dict[str, Any]],
+        encoder: Callable[[Dict[str, Any], str], Payload],
+        max_lag: int = SPECTATOR_MAX_LAG,
+    ):
+        self.message_log = message_log
+        self.snapshot_factory = snapshot_factory
+        self.encoder = encoder
+        self.max_lag = max_lag
+        self.spectators: Set[Spectator] = set()
+        self.latest_seq = 0
+        self._wakeup = asyncio.Event()
+        self._payloads: "OrderedDict[Tuple[int, str], Payload]" = OrderedDict()
+        self._snapshots: Dict[str, Tuple[int, Payload]] = {}
+
+    def __len__(self) -> int:
+        return len(self.spectators)
+
+    def publish(self, seq: int):
+        """记录新广播消息的序号并唤醒所有发送任务（不阻塞调用方）"""
+        self.latest_seq = seq
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    async def serve(self, websocket: WebSocket, protocol: str):
+        """为一个观战连接持续发送消息，直到连接失效或任务被取消"""
+        spectator = Spectator(websocket, protocol)
+        self.spectators.add(spectator)
+        try:
+            await self._send_snapshot(spectator)
+            while True:
+                if spectator.cursor >= self.latest_seq:
+                    await self._wakeup.wait()
+                    continue
+                missed = self._missed_messages(spectator.cursor)
+                if missed is None:
+                    await self._send_snapshot(spectator)
+                    continue
+                for seq, message in missed:
+                    await self._send(spectator, self._payload(seq, message, protocol))
+                    spectator.cursor = seq
+        except Exception:
+            # 发送失败说明连接已失效，由接收循环负责结束连接
+            pass
+        finally:
+            self.spectators.discard(spectator)
+
+    def _missed_messages(self, cursor: int):
+        """返回 cursor 之后的消息；落后过多或已超出日志保留范围时返回 None"""
+        if self.latest_seq - cursor > self.max_lag or not self.message_log:
+            return None
+        start = cursor + 1 - self.message_log[0][0]
+        if start < 0:
+            return None
+        return [self.message_log[i] for i in range(start, len(self.message_log))]
+
+    async def _send_snapshot(self, spectator: Spectator):
+        seq = self.latest_seq
+        cached = self._snapshots.get(spectator.protocol)
+        if cached is None or cached[0] != seq:
+            cached = (seq, self.encoder(self.snapshot_factory(), spectator.protocol))
+            self._snapshots[spectator.protocol] = cached
+        await self._send(spectator, cached[1])
+        spectator.cursor = seq
+
+    def _payload(self, seq: int, message: Dict[str, Any], protocol: str) -> Payload:
+        key = (seq, protocol)
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self.encoder(message, protocol)
+            self._payloads[key] = payload
+            if len(self._payloads) > PAYLOAD_CACHE_SIZE:
+                self._payloads.popitem(last=False)
+        return payload
+
+    @staticmethod
+    async def _send(spectator: Spectator, payload: Payload):
+        if isinstance(payload, bytes):
+            await spectator.websocket.send_bytes(payload)
+        else:
+            await spectator.websocket.send_text(payload)
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip 压缩版本
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+VERSIONED_CACHE_CONTROL = "public, max-age=31536000, immutable"  # 带 ?v=<内容哈希> 的请求内容不会变化
+REVALIDATE_CACHE_CONTROL = "no-cache"  # 固定地址每次用 ETag 校验，未变化时返回 304，不重新下载
+
+
+class StaticAsset:
+    """内存中的静态文件：原文和预压缩版本，以及内容哈希 ETag"""
+
+    def __init__(self, path: str, media_type: str, body: bytes, mtime_ns: int, size: int):
+        self.path = path
+        self.media_type = media_type
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.bodies: Dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _accepted_encodings(header: str) -> set:
+    """解析 Accept-Encoding，忽略 q=0 的编码"""
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if name and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(name.lower())
+    return encodings
+
+
+class StaticAssets:
+    """静态文件缓存
+
+    启动时把文件读入内存并预先压缩，请求只在内存中选择编码版本，不访问磁盘；
+    refresh() 检查文件的修改时间和大小，只有文件真正变化时才重新读取和压缩。
+    """
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files  # 文件路径 -> Content-Type
+        self.assets: Dict[str, StaticAsset] = {}
+        self.loaded = False
+
+    def refresh(self) -> int:
+        """重新加载有变化的文件，返回重新加载的文件数"""
+        reloaded = 0
+        for path, media_type in self.files.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if self.assets.pop(path, None) is not None:
+                    reloaded += 1
+                continue
+            cached = self.assets.get(path)
+            if cached is not None and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            asset = StaticAsset(path, media_type, body, stat.st_mtime_ns, stat.st_size)
+            if cached is None or cached.version != asset.version:
+                reloaded += 1
+            self.assets[path] = asset
+        self.loaded = True
+        return reloaded
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        if not self.loaded:
+            self.refresh()
+        return self.assets.get(path)
+
+    def response(self, request: Request, path: str) -> Optional[Response]:
+        """按 Accept-Encoding 返回预压缩版本，ETag 匹配时返回 304；文件不存在时返回 None"""
+        asset = self.get(path)
+        if asset is None:
+            return None
+        versioned = request.query_params.get("v") == asset.version
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": VERSIONED_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if asset.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in asset.bodies:
+                headers["Content-Encoding"] = encoding
+                return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+        return Response(asset.bodies["identity"], media_type=asset.media_type, headers=headers)
@@ -0,0 +1,52 @@
+import copy
+import json
+import os
+
+import pytest
+
+from board_loader import MAPS_DIR, compile_board, load_board_template
+
+
+@pytest.fixture
+def classic_data():
+    with open(os.path.join(MAPS_DIR, "classic.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("board_name", [[1], {"name": "classic"}, 1, None])
+def test_load_rejects_non_string_board_name(board_name):
+    with pytest.raises(ValueError, match="地图名必须是字符串"):
+        load_board_template(board_name)
+
+
+def test_load_rejects_path_in_board_name():
+    with pytest.raises(ValueError, match="地图名不合法"):
+        load_board_template("../classic")
+
+
+@pytest.mark.parametrize("extra_tile", ["country1", 5, ["country1"]])
+def test_compile_rejects_bad_game_map_entries(classic_data, extra_tile):
+    data = copy.deepcopy(classic_data)
+    data["game_map"].append(extra_tile)
+    with pytest.raises(ValueError, match="game_map"):
+        compile_board(data, "classic")
+
+
+def test_template_name_is_board_name(classic_data):
+    assert load_board_template("classic").name == "classic"
+    data = copy.deepcopy(classic_data)
+    del data["name"]
+    assert compile_board(data, "renamed").name == "renamed"
+
+
+def test_compile_rejects_mismatched_name(classic_data):
+    with pytest.raises(ValueError, match="name 字段"):
+        compile_board(classic_data, "other")
+
+
+def test_compile_requires_every_group_member_on_the_board(classic_data):
+    data = copy.deepcopy(classic_data)
+    group_name, group = next((name, group) for name, group in data["groups"].items() if len(group["properties"]) > 1)
+    data["game_map"].remove(group["properties"][-1])
+    with pytest.raises(ValueError, match=f"groups.{group_name} 中的 .* 不在 game_map 中"):
+        compile_board(data, "classic")
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from game import EventCard, Game, Property
+
+CHAIRMAN_CARD = "您已被选为主席，向每位玩家支付 $50"
+
+
+@pytest.fixture
+def draw_chairman_card(monkeypatch):
+    """让命运卡固定抽到"向每位玩家支付"，其他随机选择不受影响"""
+    choice = random.choice
+
+    def fixed_choice(seq):
+        if seq and isinstance(seq[0], tuple) and isinstance(seq[0][0], str):
+            return next(card for card in seq if card[0] == CHAIRMAN_CARD)
+        return choice(seq)
+
+    monkeypatch.setattr(random, "choice", fixed_choice)
+
+
+def land_on_community_card(game: Game, dice_total: int = 3):
+    """把当前玩家放在命运格前 dice_total 格，并掷出 dice_total"""
+    index = next(i for i, tile in enumerate(game.board.tiles)
+                 if isinstance(tile, EventCard) and tile.card_type == "命运")
+    game.get_current_player().position = (index - dice_total) % game.board.size
+    return game.play_turn_network(dice_total)
+
+
+def give_property(game: Game, player):
+    prop = next(tile for tile in game.board.tiles
+                if isinstance(tile, Property) and tile.owner is None and tile.cost[0] > 0)
+    prop.set_owner(player)
+    player.properties.append(prop)
+    return prop
+
+
+def test_chairman_card_pays_each_active_player(draw_chairman_card):
+    game = Game(["a", "b", "c"])
+    payer, b, c = game.players
+    payer.money = 70
+
+    result = land_on_community_card(game)
+
+    assert result["events"] == CHAIRMAN_CARD
+    assert [p.money for p in game.players] == [0, 1550, 1520]
+
+
+def test_chairman_card_skips_eliminated_players(draw_chairman_card):
+    game = Game(["a", "b", "c"])
+    payer, b, c = game.players
+    c.money = 0
+
+    land_on_community_card(game)
+
+    assert [p.money for p in game.players] == [1450, 1550, 0]
+
+
+def test_chairman_card_in_debt_payer_pays_nothing(draw_chairman_card):
+    game = Game(["a", "b", "c"])
+    payer, b, c = game.players
+    give_property(game, payer)
+    payer.money = -1  # 负债但仍可以抵押或出售地块还债
+
+    result = land_on_community_card(game)
+
+    # 负债的玩家不付款，其他玩家的现金不变，债务保留
+    assert [p.money for p in game.players] == [-1, 1500, 1500]
+    assert result["events"] == CHAIRMAN_CARD
+    assert result["debt_situation"]["debt"] == 1
+    assert result["debt_situation"]["can_recover"]
@@ -0,0 +1,55 @@
+from game import Game, Property
+
+
+def give_properties(game: Game, player, count: int):
+    props = [tile for tile in game.board.tiles
+             if isinstance(tile, Property) and tile.owner is None and tile.cost[0] > 0][:count]
+    for prop in props:
+        prop.set_owner(player)
+        player.properties.append(prop)
+    return props
+
+
+def test_trade_cannot_eliminate_sender():
+    game = Game(["a", "b"])
+    a, b = game.players
+    prop, = give_properties(game, a, 1)
+    a.money = 10
+
+    result = game.propose_trade("a", "b", 10, [prop.name], 0, [], 0.0)
+
+    assert result == {"error": "交易后 a 将没有现金和地块"}
+
+
+def test_trade_cannot_eliminate_receiver_at_settlement():
+    game = Game(["a", "b"])
+    a, b = game.players
+    prop, = give_properties(game, b, 1)
+    offer = game.propose_trade("a", "b", 0, [], 0, [prop.name], 0.0)["offer"]
+    b.money = 0  # 报价发出后 b 花光了现金
+
+    result = game.accept_trade("b", offer["offer_id"], 1.0)
+
+    assert result == {"error": "报价已失效: 交易后 b 将没有现金和地块"}
+    assert prop.owner is b
+    assert not game.is_game_over()
+
+
+def test_trade_settles_when_both_sides_stay_in_game():
+    game = Game(["a", "b"])
+    a, b = game.players
+    prop, = give_properties(game, b, 1)
+    offer = game.propose_trade("a", "b", 100, [], 0, [prop.name], 0.0)["offer"]
+
+    result = game.accept_trade("b", offer["offer_id"], 1.0)
+
+    assert "error" not in result
+    assert prop.owner is a and prop in a.properties and prop not in b.properties
+    assert (a.money, b.money) == (1400, 1600)
+
+
+def test_offer_id_must_be_an_integer():
+    game = Game(["a", "b"])
+
+    assert game.accept_trade("b", [1], 0.0) == {"error": "报价编号必须是整数"}
+    assert game.close_trade("b", {"id": 1}) == {"error": "报价编号必须是整数"}
@@ -0,0 +1,253 @@
+"""锦标赛：多桌并行对局，每桌胜者晋级下一轮
+
+用法:
+    python tournament.py --players 400 --table-size 4 --turn-cap 200
+"""
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from board_loader import BoardTemplate
+from game import MAX_PLAYERS, MIN_PLAYERS, Game, Player, Property
+
+DEFAULT_TABLE_SIZE = 4
+DEFAULT_TURN_CAP = 200  # 每桌最多掷骰次数，达到上限时按总资产决出名次
+DEFAULT_MAX_TABLES = 200  # 同时进行的最多桌数
+DEFAULT_BATCH_SIZE = 50  # 每推进该数量的桌子让出一次事件循环
+CASH_RESERVE = 200  # 默认策略：购买或升级后至少保留的现金
+
+# 决策函数：(游戏, 玩家, "buy" / "upgrade", 地块) -> 是否执行
+DecisionPolicy = Callable[[Game, Player, str, Property], bool]
+
+
+def default_policy(game: Game, player: Player, action: str, tile: Property) -> bool:
+    """买得起且保留足够现金时购买或升级"""
+    cost = tile.cost[0] if action == "buy" else tile.cost[tile.houses + 1]
+    return player.money - cost >= CASH_RESERVE
+
+
+def settle_debt(game: Game, player: Player):
+    """自动还债：先抵押、再出售地块，仍不足时按破产处理"""
+    for prop in sorted(player.properties, key=lambda p: p.mortgage_value, reverse=True):
+        if player.money >= 0:
+            return
+        prop.mortgage()
+    for prop in sorted(player.properties, key=lambda p: p.selling_price, reverse=True):
+        if player.money >= 0:
+            return
+        prop.sell()
+    if player.money < 0:
+        game.check_bankrupt(player, {"events": []})
+
+
+def _is_active(player: Player) -> bool:
+    return player.money > 0 or len(player.properties) > 0
+
+
+class Table:
+    """一桌对局：由决策函数代替玩家操作，每次 step() 进行一次掷骰"""
+
+    def __init__(self, table_id: str, players: Sequence[str], turn_cap: int,
+                 board_template: Optional[BoardTemplate] = None):
+        self.table_id = table_id
+        self.game = Game(players=list(players), board_template=board_template)
+        self.turn_cap = turn_cap
+        self.turns = 0
+        self.finished = False
+        self.capped = False  # 是否因达到回合上限而结束
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    def step(self, policy: DecisionPolicy) -> bool:
+        """进行一次掷骰及后续决策，返回本桌是否结束"""
+        game = self.game
+        player = game.get_current_player()
+        d1, d2 = game.roll_dice()
+        game.play_turn_network(d1 + d2)
+
+        pending = game.pending_action
+        if pending is not None:
+            tile = game.board.tiles[player.position]
+            action = "buy" if pending.get("action") == "prompt_buy" else "upgrade"
+            if policy(game, player, action, tile):
+                game.buy_property() if action == "buy" else game.upgrade_property()
+            if game.pending_action is not None:
+                # 放弃购买或升级（或现金不足）时结束回合
+                game.pending_action = None
+                game.next_player()
+        elif game.has_rolled_this_turn:
+            # 落在起点等无需操作的地块
+            game.next_player()
+
+        for p in game.players:
+            if p.money < 0:
+                settle_debt(game, p)
+        if not _is_active(game.get_current_player()):
+            game.next_player()
+
+        self.turns += 1
+        if game.is_game_over() or self.turns >= self.turn_cap:
+            self.finished = True
+            self.capped = not game.is_game_over()
+            self.finished_at = time.perf_counter()
+        return self.finished
+
+    def ranking(self) -> List[Player]:
+        """名次：仍在游戏中的玩家优先，其次按总资产、现金，同分按座位顺序"""
+        order = {p.name: i for i, p in enumerate(self.game.players)}
+        return sorted(self.game.players,
+                      key=lambda p: (not _is_active(p), -p.get_total_asset_value(), -p.money, order[p.name]))
+
+    @property
+    def latency(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+def seat_players(players: Sequence[str], table_size: int) -> List[List[str]]:
+    """按种子顺序蛇形分桌，各桌人数相差不超过 1，每桌至少 MIN_PLAYERS 人"""
+    count = len(players)
+    tables = max(1, math.ceil(count / table_size))
+    if count < tables * MIN_PLAYERS:
+        tables = max(1, count // MIN_PLAYERS)
+    seating: List[List[str]] = [[] for _ in range(tables)]
+    for i, name in enumerate(players):
+        row, col = divmod(i, tables)
+        seating[col if row % 2 == 0 else tables - 1 - col].append(name)
+    return seating
+
+
+class Tournament:
+    """锦标赛编排
+
+    每轮按种子分桌，同时最多进行 max_tables 桌，其余桌子在有空位时分批创建；
+    所有进行中的桌子轮流推进一次掷骰，每推进 batch_size 桌让出一次事件循环，
+    因此在服务器进程中运行也不会阻塞其他连接。每桌前 advance_per_table 名晋级，
+    按本轮总资产重新排种子，直到决出冠军。
+    """
+
+    def __init__(
+        self,
+        players: Sequence[str],
+        table_size: int = DEFAULT_TABLE_SIZE,
+        advance_per_table: int = 1,
+        turn_cap: int = DEFAULT_TURN_CAP,
+        max_tables: int = DEFAULT_MAX_TABLES,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        board_template: Optional[BoardTemplate] = None,
+        policy: DecisionPolicy = default_policy,
+    ):
+        if len(set(players)) != len(players):
+            raise ValueError("参赛玩家名不能重复")
+        if len(players) < MIN_PLAYERS:
+            raise ValueError(f"至少需要 {MIN_PLAYERS} 名玩家")
+        if not (MIN_PLAYERS <= table_size <= MAX_PLAYERS):
+            raise ValueError(f"每桌人数必须在 {MIN_PLAYERS} 到 {MAX_PLAYERS} 之间")
+        if not (1 <= advance_per_table < table_size):
+            raise ValueError("每桌晋级人数必须至少为 1 且小于每桌人数")
+        self.remaining = list(players)  # 按种子顺序
+        self.table_size = table_size
+        self.advance_per_table = advance_per_table
+        self.turn_cap = turn_cap
+        self.max_tables = max_tables
+        self.batch_size = batch_size
+        self.board_template = board_template
+        self.policy = policy
+        self.rounds: List[Dict[str, Any]] = []
+        self.champion: Optional[str] = None
+
+    async def play_round(self) -> Dict[str, Any]:
+        """进行一轮：所有桌结束后确定晋级玩家，返回本轮统计"""
+        round_number = len(self.rounds) + 1
+        seating = seat_players(self.remaining, self.table_size)
+        final = len(seating) == 1
+        started = time.perf_counter()
+
+        waiting = deque(enumerate(seating))
+        active: List[Table] = []
+        finished: List[Table] = []
+        while waiting or active:
+            # 有空位时分批开新桌
+            while waiting and len(active) < self.max_tables:
+                index, names = waiting.popleft()
+                active.append(Table(f"R{round_number}-T{index + 1}", names, self.turn_cap, self.board_template))
+            still_active = []
+            for i, table in enumerate(active):
+                if table.step(self.policy):
+                    finished.append(table)
+                else:
+                    still_active.append(table)
+                if (i + 1) % self.batch_size == 0:
+                    await asyncio.sleep(0)
+            active = still_active
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+
+        # 每桌前几名晋级（人数不多于晋级名额的桌子至少淘汰一人），按本轮总资产重排种子
+        advancing = []
+        for table in finished:
+            slots = min(self.advance_per_table, len(table.game.players) - 1)
+            advancing.extend(table.ranking()[:slots])
+        advancing.sort(key=lambda p: p.get_total_asset_value(), reverse=True)
+        self.remaining = [p.name for p in advancing]
+        if final or len(self.remaining) == 1:
+            self.champion = self.remaining[0]
+
+        latencies = sorted(table.latency for table in finished)
+        turns = sum(table.turns for table in finished)
+        report = {
+            "round": round_number,
+            "tables": len(finished),
+            "players": sum(len(table.game.players) for table in finished),
+            "advancing": len(self.remaining),
+            "capped_tables": sum(1 for table in finished if table.capped),
+            "turns": turns,
+            "elapsed_seconds": round(elapsed, 4),
+            "tables_per_second": round(len(finished) / elapsed, 2) if elapsed else 0.0,
+            "turns_per_second": round(turns / elapsed, 1) if elapsed else 0.0,
+            "table_latency_ms": {
+                "p50": round(statistics.median(latencies) * 1000, 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2),
+            },
+        }
+        self.rounds.append(report)
+        return report
+
+    async def run(self) -> Dict[str, Any]:
+        """进行所有轮次直到决出冠军"""
+        while self.champion is None:
+            await self.play_round()
+        return {"champion": self.champion, "rounds": self.rounds}
+
+
+def run_tournament(players: Sequence[str], **options) -> Dict[str, Any]:
+    """在新的事件循环中进行一整场锦标赛"""
+    return asyncio.run(Tournament(players, **options).run())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="大富翁锦标赛模拟")
+    parser.add_argument("--players", type=int, default=400, help="参赛人数")
+    parser.add_argument("--table-size", type=int, default=DEFAULT_TABLE_SIZE, help="每桌人数（2-6）")
+    parser.add_argument("--advance", type=int, default=1, help="每桌晋级人数")
+    parser.add_argument("--turn-cap", type=int, default=DEFAULT_TURN_CAP, help="每桌最多掷骰次数")
+    parser.add_argument("--max-tables", type=int, default=DEFAULT_MAX_TABLES, help="同时进行的最多桌数")
+    args = parser.parse_args(argv)
+
+    result = run_tournament(
+        [f"选手{i + 1}" for i in range(args.players)],
+        table_size=args.table_size,
+        advance_per_table=args.advance,
+        turn_cap=args.turn_cap,
+        max_tables=args.max_tables,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import heapq
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+TRADE_OFFER_TTL = 60.0  # 交易报价有效期（秒）
+MAX_OPEN_OFFERS_PER_PLAYER = 5  # 每位玩家同时发出的未决报价上限
+TRADE_SWEEP_INTERVAL = 1.0  # 服务器清理过期报价的间隔（秒）
+
+
+class TradeOffer:
+    """一份交易报价：发起方给出现金和地块，换取对方的现金和地块"""
+
+    __slots__ = ("offer_id", "sender", "receiver", "give_cash", "give_properties",
+                 "get_cash", "get_properties", "created_at", "expires_at")
+
+    def __init__(self, offer_id: int, sender: str, receiver: str, give_cash: int, give_properties: Tuple[str, ...],
+                 get_cash: int, get_properties: Tuple[str, ...], created_at: float, expires_at: float):
+        self.offer_id = offer_id
+        self.sender = sender
+        self.receiver = receiver
+        self.give_cash = give_cash
+        self.give_properties = give_properties
+        self.get_cash = get_cash
+        self.get_properties = get_properties
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "offer_id": self.offer_id,
+            "from": self.sender,
+            "to": self.receiver,
+            "give_cash": self.give_cash,
+            "give_properties": list(self.give_properties),
+            "get_cash": self.get_cash,
+            "get_properties": list(self.get_properties),
+            "expires_in": round(max(0.0, self.expires_at - now), 2),
+        }
+
+
+class TradeBook:
+    """一个房间的未决报价
+
+    报价按编号存放，并按玩家建立索引；过期时间放在最小堆中，清理时只检查堆顶，
+    没有过期报价时为 O(1)，因此大量未决报价不会拖慢正常回合。
+    已被接受、拒绝或撤回的报价不从堆中删除，出堆时跳过。
+    """
+
+    def __init__(self, ttl: float = TRADE_OFFER_TTL, max_per_player: int = MAX_OPEN_OFFERS_PER_PLAYER):
+        self.ttl = ttl
+        self.max_per_player = max_per_player
+        self._offers: Dict[int, TradeOffer] = {}
+        self._by_player: Dict[str, Set[int]] = {}  # 玩家 -> 其发出或收到的报价编号
+        self._sent_counts: Dict[str, int] = {}
+        self._expiry: List[Tuple[float, int]] = []  # (过期时间, 报价编号)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def can_send(self, player: str) -> bool:
+        return self._sent_counts.get(player, 0) < self.max_per_player
+
+    def add(self, sender: str, receiver: str, give_cash: int, give_properties: Tuple[str, ...],
+            get_cash: int, get_properties: Tuple[str, ...], now: float) -> TradeOffer:
+        offer = TradeOffer(self._next_id, sender, receiver, give_cash, give_properties,
+                           get_cash, get_properties, now, now + self.ttl)
+        self._next_id += 1
+        self._offers[offer.offer_id] = offer
+        for player in (sender, receiver):
+            self._by_player.setdefault(player, set()).add(offer.offer_id)
+        self._sent_counts[sender] = self._sent_counts.get(sender, 0) + 1
+        heapq.heappush(self._expiry, (offer.expires_at, offer.offer_id))
+        return offer
+
+    def get(self, offer_id: int) -> Optional[TradeOffer]:
+        return self._offers.get(offer_id)
+
+    def remove(self, offer_id: int) -> Optional[TradeOffer]:
+        offer = self._offers.pop(offer_id, None)
+        if offer is None:
+            return None
+        for player in (offer.sender, offer.receiver):
+            ids = self._by_player.get(player)
+            if ids is not None:
+                ids.discard(offer_id)
+                if not ids:
+                    del self._by_player[player]
+        count = self._sent_counts.get(offer.sender, 0) - 1
+        if count > 0:
+            self._sent_counts[offer.sender] = count
+        else:
+            self._sent_counts.pop(offer.sender, None)
+        return offer
+
+    def for_player(self, player: str) -> List[TradeOffer]:
+        """玩家发出或收到的未决报价，按编号排序"""
+        return [self._offers[offer_id] for offer_id in sorted(self._by_player.get(player, ()))]
+
+    def remove_player(self, player: str) -> List[TradeOffer]:
+        """移除涉及某位玩家的所有报价（例如玩家破产）"""
+        return [self.remove(offer_id) for offer_id in list(self._by_player.get(player, ()))]
+
+    def expire(self, now: float) -> List[TradeOffer]:
+        """移除并返回已过期的报价"""
+        expired = []
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            _, offer_id = heapq.heappop(heap)
+            offer = self.remove(offer_id)
+            if offer is not None:
+                expired.append(offer)
+        return expired